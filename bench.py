@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import timeit
+import tracemalloc
+
+from fuzz import Grammar
+from main import GeneratorPDA
+
+# Бенчмарки на синтетических семействах грамматик. Каждое семейство по размеру n возвращает
+# текст grammar.txt, стартовый нетерминал, k и слово для разбора. Результаты пишутся в JSON,
+# режим --compare сравнивает их с сохранённым прогоном и отмечает регрессии.
+# Время меряется как в timeit: вызовы повторяются, пока замер не займёт хотя бы 0.2 с (autorange),
+# в результат идут минимум и медиана времени одного вызова из repeat замеров.
+
+SEED = 12345
+TIMER_NOISE = 1e-3  # секунд на весь замер: меньшая разница — шум таймера и планировщика
+MEMORY_NOISE = 4096  # байт: гранулярность выделения памяти
+
+LETTERS = [c for c in map(chr, range(0x61, 0x500)) if c.islower()]
+
+
+def rightRecursion(n):
+    # S -> aS | b, слово a^n b: глубокая правая рекурсия
+    return 'S -> aS | b', 'S', 1, 'a' * n + 'b'
+
+
+def wideAlphabet(n):
+    letters = LETTERS[:n]
+    rules = ' | '.join(c + 'S' for c in letters) + ' | ' + letters[0]
+    return f'S -> {rules}', 'S', 1, ''.join(letters) * 4 + letters[0]
+
+
+def llkDepth(n):
+    # альтернативы различаются только n-м символом, грамматика LL(n)
+    prefix = 'a' * (n - 1)
+    return f'S -> {prefix}bS | {prefix}cS | d', 'S', n, (prefix + 'b' + prefix + 'c') * 4 + 'd'
+
+
+def ambiguous(n):
+    # число деревьев для b^n — число Каталана
+    return 'S -> SS | b', 'S', 1, 'b' * n
+
+
+def cnfBlowup(n):
+    # длинные правила: HNFTransform заводит по нетерминалу на каждый символ
+    letters = LETTERS[:n]
+    return (f'S -> {"".join(letters)}S | {"".join(reversed(letters))}S | x',
+            'S', 1, ''.join(letters) * 3 + 'x')
+
+
+FAMILIES = {
+    'rightRecursion': (rightRecursion, [10, 100, 1000]),
+    'wideAlphabet': (wideAlphabet, [4, 16, 64]),
+    'llkDepth': (llkDepth, [1, 2, 4]),
+    'ambiguous': (ambiguous, [5, 8, 11]),
+    'cnfBlowup': (cnfBlowup, [4, 16, 64]),
+}
+
+# checkWord на неоднозначных грамматиках растёт экспоненциально, CYK — кубически
+LIMITS = {
+    ('ambiguous', 'checkWord'): 8,
+    ('rightRecursion', 'CYK'): 100,
+    ('wideAlphabet', 'CYK'): 16,
+    ('cnfBlowup', 'CYK'): 16,
+}
+
+
+def prepareGrammar(startingNT):
+    grammar = Grammar()
+    grammar.readGrammar(startingNT=startingNT)
+    grammar.prepareForGeneration()
+    return grammar
+
+
+def operations(startingNT, k, word):
+    def createParseTable():
+        GeneratorPDA(k).createParseTable(startingNT=startingNT, useCache=False)
+
+    def readParseTable():
+        GeneratorPDA(k).readParseTable()
+
+    PDA = GeneratorPDA(k)
+    PDA.createParseTable(startingNT=startingNT, useCache=False)
+
+    def checkWord():
+        PDA.checkWord(word, tree=False)
+
+    def HNFTransform():
+        grammar = Grammar()
+        grammar.readGrammar(startingNT=startingNT)
+        grammar.HNFTransform()
+
+    grammar = prepareGrammar(startingNT)
+
+    def CYK():
+        grammar.CYK(word)
+
+    def CYKBitset():
+        grammar.CYKBitset(word)
+
+    def Earley():
+        grammar.Earley(word)
+
+    def generate():
+        # одно и то же зерно: каждый прогон делает одинаковую работу
+        random.seed(SEED)
+        grammar.generate(n=200, testing=False)
+
+    return {
+        'createParseTable': createParseTable,
+        'readParseTable': readParseTable,
+        'checkWord': checkWord,
+        'HNFTransform': HNFTransform,
+        'CYK': CYK,
+        'CYKBitset': CYKBitset,
+        'Earley': Earley,
+        'generate': generate,
+    }
+
+
+def measure(function, repeat):
+    # (минимум и медиана времени вызова, число вызовов в замере, пиковая память)
+    timer = timeit.Timer(function)
+    loops, _ = timer.autorange()
+    times = [total / loops for total in timer.repeat(repeat, loops)]
+    # пиковая память меряется отдельным прогоном: tracemalloc сильно замедляет код
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), statistics.median(times), loops, peak
+
+
+def runBenchmarks(families=None, repeat=3):
+    results = []
+    cwd = os.getcwd()
+    for family in families or FAMILIES:
+        make, sizes = FAMILIES[family]
+        for size in sizes:
+            grammar_str, startingNT, k, word = make(size)
+            with tempfile.TemporaryDirectory() as directory:
+                os.chdir(directory)
+                try:
+                    with open('grammar.txt', 'w') as f:
+                        f.write(grammar_str)
+                    for name, function in operations(startingNT, k, word).items():
+                        limit = LIMITS.get((family, name))
+                        if limit is not None and size > limit:
+                            continue
+                        seconds, median, loops, peak = measure(function, repeat)
+                        results.append({'family': family, 'size': size, 'operation': name,
+                                        'seconds': seconds, 'median': median, 'loops': loops, 'peakBytes': peak})
+                        print(f'{family:>16} {size:>6} {name:>18} {seconds * 1000:10.3f} ms '
+                              f'(median {median * 1000:.3f} ms, x{loops}) {peak / 1024:10.1f} KiB')
+                finally:
+                    os.chdir(cwd)
+    return results
+
+
+def compareResults(results, baseline, threshold):
+    # регрессия — рост пиковой памяти или времени вызова больше чем в (1 + threshold) раз и больше шума
+    # (для времени — TIMER_NOISE на весь замер из loops вызовов). Время считается выросшим, только если
+    # выросли и минимум, и медиана: один медленный замер регрессией не считается
+    old = {(r['family'], r['size'], r['operation']): r for r in baseline['results']}
+    regressions = []
+
+    def grew(result, before, metric, noise):
+        return result[metric] > before[metric] * (1 + threshold) and result[metric] - before[metric] > noise
+
+    for result in results:
+        before = old.get((result['family'], result['size'], result['operation']))
+        if before is None:
+            continue
+        noise = TIMER_NOISE / result.get('loops', 1)
+        if grew(result, before, 'seconds', noise) and (
+                'median' not in before or grew(result, before, 'median', noise)):
+            regressions.append((result, 'seconds', before['seconds']))
+        if grew(result, before, 'peakBytes', MEMORY_NOISE):
+            regressions.append((result, 'peakBytes', before['peakBytes']))
+    for result, metric, before in regressions:
+        print(f'REGRESSION {result["family"]} {result["size"]} {result["operation"]} {metric}: '
+              f'{before:.6g} -> {result[metric]:.6g}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmarks on synthetic grammar families')
+    parser.add_argument('--family', action='append', choices=sorted(FAMILIES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='baseline JSON written by an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = runBenchmarks(args.family, args.repeat)
+    with open(args.output, 'w') as f:
+        json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                   'results': results}, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compareResults(results, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+from collections import defaultdict
+
+
+class EarleyRecognizer:
+    # Распознаватель Эрли прямо по правилам grammar.txt, без HNFTransform. Ситуация — (правило, точка, начало).
+    # Для каждого нетерминала заранее посчитаны его непосредственные левые углы (с учётом пустых префиксов),
+    # предсказание обходит их в каждом множестве Эрли не больше одного раза на нетерминал,
+    # пустые нетерминалы перешагиваются сразу (Aycock–Horspool),
+    # а цепочки детерминированных завершений правой рекурсии сворачиваются по Лео,
+    # поэтому на однозначных и LR-регулярных грамматиках разбор линейный.
+    def __init__(self, NT_To_Rules, startingNT):
+        self.startingNT = startingNT
+        self.rules = []
+        self.lhs = []
+        self.rulesOfNT = defaultdict(list)
+        for NT, rightRules in NT_To_Rules.items():
+            for rightRule in rightRules:
+                self.rulesOfNT[NT].append(len(self.rules))
+                self.rules.append(tuple(rightRule))
+                self.lhs.append(NT)
+        # S' -> S: её завершение с начала слова означает, что слово принято
+        self.startRule = len(self.rules)
+        self.rules.append((startingNT,))
+        self.lhs.append(None)
+
+        self.nullable = self.findNullable()
+        self.leftCorners = self.findLeftCorners()
+
+    def findNullable(self):
+        # правило пустое, когда пусты все символы правой части; счётчик непустых по правилу
+        remaining = []
+        dependent = defaultdict(list)
+        queue = []
+        for r, rule in enumerate(self.rules):
+            if any(symbol not in self.rulesOfNT for symbol in rule):
+                remaining.append(-1)
+                continue
+            remaining.append(len(rule))
+            for symbol in rule:
+                dependent[symbol].append(r)
+            if not rule:
+                queue.append(r)
+        nullable = set([])
+        while queue:
+            NT = self.lhs[queue.pop()]
+            if NT in nullable or NT is None:
+                continue
+            nullable.add(NT)
+            for r in dependent[NT]:
+                remaining[r] -= 1
+                if remaining[r] == 0:
+                    queue.append(r)
+        return nullable
+
+    def findLeftCorners(self):
+        # leftCorners[A] — нетерминалы, с которых может начинаться вывод правила A (после пустого префикса);
+        # транзитивное замыкание не хранится: на цепочке из n нетерминалов оно заняло бы O(n²)
+        leftCorners = defaultdict(set)
+        for r, rule in enumerate(self.rules):
+            for symbol in rule:
+                if symbol not in self.rulesOfNT:
+                    break
+                leftCorners[self.lhs[r]].add(symbol)
+                if symbol not in self.nullable:
+                    break
+        return {NT: tuple(leftCorners[NT]) for NT in self.rulesOfNT}
+
+    def leoTop(self, j, A, waiting, leo):
+        # Вершина цепочки Лео для завершения A, начатого на позиции j: пока ровно одна ситуация ждёт
+        # символа и он последний в её правиле, её завершение однозначно, и сразу берётся самое верхнее.
+        # None — цепочки нет, нужно обычное завершение.
+        path = []
+        seen = set([])
+        result = None
+        cycle = False
+        while True:
+            if A in leo[j]:
+                result = leo[j][A]
+                break
+            if (j, A) in seen:
+                cycle = True
+                break
+            seen.add((j, A))
+            items = waiting[j].get(A)
+            if not items or len(items) != 1:
+                leo[j][A] = None
+                break
+            r, d, o = items[0]
+            if d + 1 != len(self.rules[r]):
+                leo[j][A] = None
+                break
+            path.append((j, A, (r, d + 1, o)))
+            j, A = o, self.lhs[r]
+        for j, A, candidate in reversed(path):
+            if not cycle and result is None:
+                result = candidate
+            leo[j][A] = None if cycle else result
+        return None if cycle else result
+
+    def recognize(self, word) -> bool:
+        rules = self.rules
+        lhs = self.lhs
+        nullable = self.nullable
+        leftCorners = self.leftCorners
+        rulesOfNT = self.rulesOfNT
+        accept = (self.startRule, 1, 0)
+
+        waiting = []  # waiting[j][A] — ситуации позиции j с точкой перед A
+        leo = []
+        current = [(self.startRule, 0, 0)]
+        for i in range(len(word) + 1):
+            char = word[i] if i < len(word) else None
+            items = set(current)
+            wait = defaultdict(list)
+            waiting.append(wait)
+            leo.append({})
+            predicted = set([])
+            nextItems = []
+
+            def add(item):
+                if item not in items:
+                    items.add(item)
+                    current.append(item)
+
+            while current:
+                item = current.pop()
+                r, d, o = item
+                rule = rules[r]
+                if d == len(rule):
+                    # завершения с o == i уже учтены перешагиванием пустых нетерминалов
+                    if o == i:
+                        continue
+                    A = lhs[r]
+                    top = self.leoTop(o, A, waiting, leo)
+                    if top is not None:
+                        add(top)
+                    else:
+                        for r2, d2, o2 in waiting[o].get(A, ()):
+                            add((r2, d2 + 1, o2))
+                    continue
+
+                X = rule[d]
+                if X in rulesOfNT:
+                    wait[X].append(item)
+                    if X not in predicted:
+                        # замыкание по левым углам, уже предсказанные в этом множестве не обходятся
+                        predicted.add(X)
+                        corners = [X]
+                        while corners:
+                            B = corners.pop()
+                            for r2 in rulesOfNT[B]:
+                                add((r2, 0, i))
+                            for C in leftCorners[B]:
+                                if C not in predicted:
+                                    predicted.add(C)
+                                    corners.append(C)
+                    if X in nullable:
+                        add((r, d + 1, o))
+                elif X == char:
+                    nextItems.append((r, d + 1, o))
+
+            if char is None:
+                return accept in items
+            if not nextItems:
+                return False
+            current = nextItems
+        return False
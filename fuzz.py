@@ -1,19 +1,27 @@
+from bisect import bisect_right
 from collections import defaultdict, deque
-import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
 import random
 import string
 
-sys.setrecursionlimit(10000)
-
-
-def isNT(symbol: str) -> bool:
-    return not symbol[0].islower()
+from earley import EarleyRecognizer
+from grammarir import compileGrammar, isNT
 
 
 def getSetOFNTs(rule: list) -> set:
     return set([symbol for symbol in rule if isNT(symbol)])
 
 
+def bitIndexes(mask: int):
+    # номера единичных битов маски по возрастанию
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
 class Grammar():
 
     def __init__(self):
@@ -23,6 +31,7 @@ class Grammar():
         self.terminals = set([])
         self.startingNT = None
         self.counter = 1
+        self.compiledGrammar = None
 
         self.first = defaultdict(set)
         self.last = defaultdict(set)
@@ -31,40 +40,34 @@ class Grammar():
         self.followNT = defaultdict(set)
         self.bigramms = defaultdict(set)
 
+        # те же отношения на битовых масках: бит i — терминал bigramSymbols[i]
+        self.bigramSymbols = []
+        self.terminalBits = {}
+        self.firstMasks = defaultdict(int)
+        self.lastMasks = defaultdict(int)
+        self.followMasks = defaultdict(int)
+        self.precedeMasks = defaultdict(int)
+        self.bigramRows = []
+
         self.NT_To_T_Rules = defaultdict(list)
         self.NT_To_NT_Rules = defaultdict(list)
+        self.terminalToNTs = defaultdict(list)
+        self.binaryRules = []
+        self.startingNTId = None
 
-    def readGrammar(self, startingNT=None):
-        with open('grammar.txt', 'r') as file:
-            lines = file.readlines()
+        self.derivationCounts = {}
+        self.derivationChoices = {}
+        self.earley = None
 
-        for line in lines:
-            line_splited = list(map(lambda r: r.replace(' ', ''), line.strip().split('->')))
-            NT = line_splited[0]
-            rightRule = list(map(lambda l: l.strip(), line_splited[1].split('|')))
-            self.NT_To_Rules[NT] += list(map(self.parseRule, rightRule))
+    def readGrammar(self, startingNT=None):
+        self.useCompiledGrammar(compileGrammar(startingNT))
 
+    def useCompiledGrammar(self, grammar):
+        # правила копируются из общей скомпилированной грамматики (grammarir.py)
+        self.compiledGrammar = grammar
+        self.NT_To_Rules = defaultdict(list, grammar.ntToRules())
         self.updateGrammar()
-
-        self.startingNT = startingNT
-        if not self.startingNT:
-            self.startingNT = self.findStartingNT()
-
-    def findStartingNT(self):
-        maxVisited = ("", 0)
-        for NT in self.allNTs:
-            visited = set([])
-            self.findStartingNTRecursion(NT, visited)
-            if len(visited) > maxVisited[1]:
-                maxVisited = (NT, len(visited))
-        return maxVisited[0]
-
-    def findStartingNTRecursion(self, NT1, visited):
-        visited.add(NT1)
-        for rightRule in self.NT_To_Rules[NT1]:
-            for NT2 in getSetOFNTs(rightRule):
-                if NT2 not in visited:
-                    self.findStartingNTRecursion(NT2, visited)
+        self.startingNT = grammar.startingNT
 
     def prepareForGeneration(self):
         self.HNFTransform()
@@ -78,28 +81,7 @@ class Grammar():
                 self.rules.append((NT, rightRule))
         self.allNTs = set(self.NT_To_Rules.keys())
 
-        self.terminals = set([])
-        for _, rightRule in self.rules:
-            self.terminals = self.terminals.union(set([symbol for symbol in rightRule if not isNT(symbol)]))
-
-    def parseRule(self, s: str) -> list:
-        newList = []
-        i = 0
-        while i < len(s):
-            if s[i] == '[':
-                start = i
-                while s[i] != ']':
-                    i += 1
-                newList.append(s[start:i + 1])
-            else:
-                if i < len(s) - 1 and s[i + 1].isnumeric():
-                    newList.append(s[i:i + 2])
-                    i += 1
-                else:
-                    newList.append(s[i])
-            i += 1
-
-        return newList
+        self.terminals = set([symbol for _, rightRule in self.rules for symbol in rightRule if not isNT(symbol)])
 
     def HNFTransform(self):
         self.deleteLongRules()
@@ -109,38 +91,47 @@ class Grammar():
         self.deleteAloneTerminals()
 
     def deleteLongRules(self):
+        # правило X1..Xn разворачивается в цепочку NT -> X1 N1, N1 -> X2 N2, ..., имена как раньше
+        # строятся от предыдущего нетерминала цепочки
         for NT in self.allNTs:
-            self.deleteLongRulesRecursion(NT)
+            for i, rightRule in enumerate(self.NT_To_Rules[NT]):
+                owner, rules, j = NT, self.NT_To_Rules[NT], i
+                start = 0
+                while len(rightRule) - start > 2:
+                    newNT = f"[new_NT_{owner + str(self.counter)}]"
+                    self.counter += 1
+                    rules[j] = [rightRule[start], newNT]
+                    start += 1
+                    owner, rules, j = newNT, [rightRule[start:]], 0
+                    self.NT_To_Rules[newNT] = rules
         self.updateGrammar()
 
-    def deleteLongRulesRecursion(self, NT: str):
-        for i, rightRule in enumerate(self.NT_To_Rules[NT]):
-            if len(rightRule) > 2:
-                newNT = f"[new_NT_{NT + str(self.counter)}]"
-                self.counter += 1
-                self.NT_To_Rules[newNT] = [rightRule[1:]]
-                newRightRule = [rightRule[0], newNT]
-                self.NT_To_Rules[NT][i] = newRightRule
-                self.deleteLongRulesRecursion(newNT)
-
     def deleteChainRules(self):
-        visited = set([])
-        self.deleteChainRulesRecursion(self.startingNT, visited)
-        self.updateGrammar()
-
-    def deleteChainRulesRecursion(self, NT_root: str, visited: set):
-        visited.add(NT_root)
-        for rightRule in self.NT_To_Rules[NT_root]:
-            for NT in getSetOFNTs(rightRule):
+        # обход в глубину от стартового нетерминала на явном стеке: правила нетерминала
+        # переписываются после обхода всех его потомков, в том же порядке, что и рекурсивно
+        def children(NT):
+            for rightRule in self.NT_To_Rules[NT]:
+                yield from getSetOFNTs(rightRule)
+
+        visited = set([self.startingNT])
+        stack = [(self.startingNT, children(self.startingNT))]
+        while stack:
+            NT_root, pending = stack[-1]
+            for NT in pending:
                 if NT not in visited:
-                    self.deleteChainRulesRecursion(NT, visited)
-        newRules = []
-        for rightRule in self.NT_To_Rules[NT_root]:
-            if len(rightRule) == 1 and isNT(rightRule[0]):
-                newRules += self.NT_To_Rules[rightRule[0]]
+                    visited.add(NT)
+                    stack.append((NT, children(NT)))
+                    break
             else:
-                newRules.append(rightRule)
-        self.NT_To_Rules[NT_root] = newRules.copy()
+                stack.pop()
+                newRules = []
+                for rightRule in self.NT_To_Rules[NT_root]:
+                    if len(rightRule) == 1 and isNT(rightRule[0]):
+                        newRules += self.NT_To_Rules[rightRule[0]]
+                    else:
+                        newRules.append(rightRule)
+                self.NT_To_Rules[NT_root] = newRules
+        self.updateGrammar()
 
     def deleteNonGenerative(self):
         isGenerating = defaultdict(bool)
@@ -150,7 +141,8 @@ class Grammar():
         allNTs = set([])
         for i, (NT1, rightRule) in enumerate(self.rules):
             count = getSetOFNTs(rightRule)
-            allNTs = allNTs.union(count, set([NT1]))
+            allNTs.update(count)
+            allNTs.add(NT1)
             for NT2 in count:
                 concernedRule[NT2] += [i]
             counter[i] += len(count)
@@ -176,7 +168,7 @@ class Grammar():
         newRules = set([])
         for NT, val in isGenerating.items():
             if not val:
-                newRules = set.union(newRules, set(set(concernedRule[NT])))
+                newRules.update(concernedRule[NT])
         self.rules = [rule for i, rule in enumerate(self.rules) if i not in newRules]
         self.NT_To_Rules = defaultdict(list)
         for NT, rightRule in self.rules:
@@ -184,34 +176,26 @@ class Grammar():
         self.updateGrammar()
 
     def deleteNonReacheble(self):
-        rule2rule = defaultdict(list)
-        NT_To_RuleNumber = defaultdict(list)
-        RuleNumber_To_NTs = defaultdict(set)
-        for i, (NT, rightRule) in enumerate(self.rules):
-            NT_To_RuleNumber[NT] += [i]
-            RuleNumber_To_NTs[i] = getSetOFNTs(rightRule)
-        for RuleNumber, NTs in RuleNumber_To_NTs.items():
-            for NT in NTs:
-                if NT_To_RuleNumber[NT]:
-                    rule2rule[RuleNumber] += NT_To_RuleNumber[NT]
-
-        visited = set([])
-        for ruleNumber, (NT, _) in enumerate(self.rules):
-            if NT == self.startingNT:
-                self.deleteNonReachebleRecursion(ruleNumber, visited, rule2rule)
-
-        self.rules = [rule for i, rule in enumerate(self.rules) if i in visited]
+        # правило достижимо ровно тогда, когда достижима его левая часть,
+        # поэтому достаточно обойти граф нетерминалов, а не граф правил
+        NT_To_NTs = defaultdict(set)
+        for NT, rightRule in self.rules:
+            NT_To_NTs[NT].update(getSetOFNTs(rightRule))
+
+        visited = set([self.startingNT])
+        stack = [self.startingNT]
+        while stack:
+            for NT in NT_To_NTs[stack.pop()]:
+                if NT not in visited:
+                    visited.add(NT)
+                    stack.append(NT)
+
+        self.rules = [rule for rule in self.rules if rule[0] in visited]
         self.NT_To_Rules = defaultdict(list)
         for NT, rightRule in self.rules:
             self.NT_To_Rules[NT] += [rightRule]
         self.updateGrammar()
 
-    def deleteNonReachebleRecursion(self, ruleNumber: int, visited: set, rule2rule: defaultdict):
-        visited.add(ruleNumber)
-        for next in rule2rule[ruleNumber]:
-            if next not in visited:
-                self.deleteNonReachebleRecursion(next, visited, rule2rule)
-
     def deleteAloneTerminals(self):
         newRules = {}
         for i, (NT, rightRule) in enumerate(self.rules):
@@ -238,52 +222,68 @@ class Grammar():
             print(NT, '- >', "".join(rightRule))
 
     def makeBigramms(self):
+        self.bigramSymbols = sorted(self.terminals)
+        self.terminalBits = {terminal: 1 << i for i, terminal in enumerate(self.bigramSymbols)}
         self.makeFirstAndLast()
         self.makeFollow()
         self.makePrecede()
         self.useConditions()
 
     def makeFirstAndLast(self):
-        visited = set([])
-        for NT in self.allNTs:
-            if NT not in visited:
-                self.makeFirstAndLastRecursion(NT, visited)
-
-    def makeFirstAndLastRecursion(self, NT, visited):
-        visited.add(NT)
-        for rightRule in self.NT_To_Rules[NT]:
-            if isNT(rightRule[0]):
-                if rightRule[0] not in visited:
-                    self.makeFirstAndLastRecursion(rightRule[0], visited)
-                self.first[NT] = self.first[NT].union(self.first[rightRule[0]])
-            else:
-                self.first[NT].add(rightRule[0])
-            if isNT(rightRule[-1]):
-                if rightRule[-1] not in visited:
-                    self.makeFirstAndLastRecursion(rightRule[-1], visited)
-                self.last[NT] = self.last[NT].union(self.last[rightRule[-1]])
+        self.firstMasks = self.makeEdgeMasks(0)
+        self.lastMasks = self.makeEdgeMasks(-1)
+        self.first = self.masksToSets(self.firstMasks)
+        self.last = self.masksToSets(self.lastMasks)
+
+    def makeEdgeMasks(self, side):
+        # first (side == 0) или last (side == -1) до неподвижной точки: терминалы с края правила
+        # сразу попадают в маску, а изменившаяся маска нетерминала передаётся по обратным рёбрам
+        # только тем, у кого он стоит с этого края; в очереди каждый нетерминал не больше одного раза
+        masks = defaultdict(int)
+        parents = defaultdict(set)
+        for NT, rightRule in self.rules:
+            if not rightRule:
+                continue
+            symbol = rightRule[side]
+            if isNT(symbol):
+                parents[symbol].add(NT)
             else:
-                self.last[NT].add(rightRule[-1])
+                masks[NT] |= self.terminalBits[symbol]
+        queue = deque([NT for NT, mask in masks.items() if mask])
+        inQueue = set(queue)
+        while queue:
+            NT = queue.popleft()
+            inQueue.discard(NT)
+            mask = masks[NT]
+            for parent in parents[NT]:
+                if mask & ~masks[parent]:
+                    masks[parent] |= mask
+                    if parent not in inQueue:
+                        inQueue.add(parent)
+                        queue.append(parent)
+        return masks
+
+    def masksToSets(self, masks):
+        sets = defaultdict(set)
+        for symbol, mask in masks.items():
+            sets[symbol] = set([self.bigramSymbols[i] for i in bitIndexes(mask)])
+        return sets
 
     def makeFollow(self):
-        changed = True
-        while changed:
-            changed = False
-            for NT, rightRule in self.rules:
-                if len(rightRule) > 1:
-                    if not all(map(lambda terminal: terminal in self.follow[rightRule[0]], self.first[rightRule[1]])):
-                        changed = True
-                    self.follow[rightRule[0]] = self.follow[rightRule[0]].union(self.first[rightRule[1]])
+        # follow[B] пополняется только first[C] из правил A -> BC, а first уже готов,
+        # поэтому зависимостей между правилами нет и хватает одного прохода
+        self.followMasks = defaultdict(int)
+        for NT, rightRule in self.rules:
+            if len(rightRule) > 1:
+                self.followMasks[rightRule[0]] |= self.firstMasks.get(rightRule[1], 0)
+        self.follow = self.masksToSets(self.followMasks)
 
     def makePrecede(self):
-        changed = True
-        while changed:
-            changed = False
-            for NT, rightRule in self.rules:
-                if len(rightRule) > 1:
-                    if not all(map(lambda terminal: terminal in self.precede[rightRule[1]], self.last[rightRule[0]])):
-                        changed = True
-                    self.precede[rightRule[1]] = self.precede[rightRule[1]].union(self.last[rightRule[0]])
+        self.precedeMasks = defaultdict(int)
+        for NT, rightRule in self.rules:
+            if len(rightRule) > 1:
+                self.precedeMasks[rightRule[1]] |= self.lastMasks.get(rightRule[0], 0)
+        self.precede = self.masksToSets(self.precedeMasks)
 
     def makeFollowNT(self):
         for _, rightRule in self.rules:
@@ -291,21 +291,34 @@ class Grammar():
                 self.followNT[rightRule[0]].add(rightRule[1])
 
     def useConditions(self):
-        for NT, gammas in self.last.items():
-            for y1 in gammas:
-                for y2 in self.follow[NT]:
-                    self.bigramms[y1].add(y2)
-
-        for NT, gammas in self.precede.items():
-            for y1 in gammas:
-                for y2 in self.first[NT]:
-                    self.bigramms[y1].add(y2)
+        # матрица биграмм: bigramRows[i] — маска терминалов, которые могут идти за bigramSymbols[i];
+        # строка пополняется целой маской, а не по одному терминалу
+        rows = [0] * len(self.bigramSymbols)
+        for NT, lastMask in self.lastMasks.items():
+            followMask = self.followMasks.get(NT, 0)
+            if followMask:
+                for i in bitIndexes(lastMask):
+                    rows[i] |= followMask
+
+        for NT, precedeMask in self.precedeMasks.items():
+            firstMask = self.firstMasks.get(NT, 0)
+            if firstMask:
+                for i in bitIndexes(precedeMask):
+                    rows[i] |= firstMask
 
         for NT, val in self.followNT.items():
+            firstMask = 0
             for A2 in val:
-                for y1 in self.last[NT]:
-                    for y2 in self.first[A2]:
-                        self.bigramms[y1].add(y2)
+                firstMask |= self.firstMasks.get(A2, 0)
+            if firstMask:
+                for i in bitIndexes(self.lastMasks.get(NT, 0)):
+                    rows[i] |= firstMask
+
+        self.bigramRows = rows
+        self.bigramms = defaultdict(set)
+        for i, row in enumerate(rows):
+            if row:
+                self.bigramms[self.bigramSymbols[i]] = set([self.bigramSymbols[j] for j in bitIndexes(row)])
 
     def prepareForCYK(self):
         for NT, rightRule in self.rules:
@@ -314,6 +327,22 @@ class Grammar():
             else:
                 self.NT_To_NT_Rules[NT].append(rightRule)
 
+        # для CYKBitset: нетерминалы нумеруются, правила A -> BC группируются по A
+        NTIds = {NT: i for i, NT in enumerate(sorted(self.allNTs))}
+        self.terminalToNTs = defaultdict(list)
+        for NT, rightRules in self.NT_To_T_Rules.items():
+            for rightRule in rightRules:
+                self.terminalToNTs[rightRule].append(NTIds[NT])
+        self.binaryRules = []
+        for NT, rightRules in self.NT_To_NT_Rules.items():
+            pairs = [(NTIds[rightRule[0]], NTIds[rightRule[1]]) for rightRule in rightRules
+                     if rightRule[0] in NTIds and rightRule[1] in NTIds]
+            if pairs:
+                self.binaryRules.append((NTIds[NT], pairs))
+        self.startingNTId = NTIds.get(self.startingNT)
+        self.derivationCounts = {}
+        self.derivationChoices = {}
+
     def CYK(self, word):
         d = {NT: [[False for _ in range(len(word))] for _ in range(len(word))] for NT in self.allNTs}
         for i in range(len(word)):
@@ -332,41 +361,234 @@ class Grammar():
                     d[NT][i][j] = answer
         return d[self.startingNT][0][len(word) - 1]
 
+    def CYKBitset(self, word):
+        # rows[A][i] — битовая маска концов j, для которых A =>* word[i..j], cols[A][j] — маска начал i.
+        # Все точки разбиения k проверяются одной операцией: (rows[B][i] << 1) & cols[C][j],
+        # бит k + 1 которой означает B =>* word[i..k] и C =>* word[k+1..j].
+        n = len(word)
+        if n == 0 or self.startingNTId is None:
+            return False
+        NTsCount = len(self.allNTs)
+        rows = [[0] * n for _ in range(NTsCount)]
+        cols = [[0] * n for _ in range(NTsCount)]
+        for i, terminal in enumerate(word):
+            for A in self.terminalToNTs.get(terminal, ()):
+                rows[A][i] |= 1 << i
+                cols[A][i] |= 1 << i
+
+        for m in range(1, n):
+            for i in range(n - m):
+                j = i + m
+                bit_i = 1 << i
+                bit_j = 1 << j
+                for A, pairs in self.binaryRules:
+                    for B, C in pairs:
+                        if (rows[B][i] << 1) & cols[C][j]:
+                            rows[A][i] |= bit_j
+                            cols[A][j] |= bit_i
+                            break
+        return bool(rows[self.startingNTId][0] >> (n - 1) & 1)
+
+    def Earley(self, word):
+        # по исходным правилам из grammar.txt: HNFTransform для разметки не нужен
+        if self.earley is None:
+            rules = self.compiledGrammar.ntToRules() if self.compiledGrammar else self.NT_To_Rules
+            self.earley = EarleyRecognizer(rules, self.startingNT)
+        return self.earley.recognize(word)
+
+    def countDerivations(self, length):
+        # derivationCounts[NT][L] — число выводов слов длины L из NT в грамматике после HNFTransform
+        # (правила NT -> a и NT -> BC), таблицы дописываются до нужной длины и переиспользуются.
+        # Если HNFTransform удалил стартовый нетерминал, язык пуст и выводов нет.
+        if self.startingNT not in self.allNTs:
+            return 0
+        if not self.derivationCounts:
+            self.derivationCounts = {NT: [0] for NT in self.allNTs}
+            self.derivationChoices = {}
+        counts = self.derivationCounts
+        for L in range(len(counts[self.startingNT]), length + 1):
+            for NT in self.allNTs:
+                if L == 1:
+                    total = sum(1 for rightRule in self.NT_To_T_Rules[NT] if not isNT(rightRule))
+                else:
+                    total = 0
+                    for B, C in self.NT_To_NT_Rules[NT]:
+                        countsB, countsC = counts[B], counts[C]
+                        total += sum(countsB[i] * countsC[L - i] for i in range(1, L))
+                counts[NT].append(total)
+        return counts[self.startingNT][length]
+
+    def derivationChoice(self, NT, length):
+        # накопленные веса вариантов (правило, длина левой части) для выбора бинарным поиском
+        key = (NT, length)
+        if key not in self.derivationChoices:
+            counts = self.derivationCounts
+            cumulative = []
+            choices = []
+            total = 0
+            if length == 1:
+                for rightRule in self.NT_To_T_Rules[NT]:
+                    if not isNT(rightRule):
+                        total += 1
+                        cumulative.append(total)
+                        choices.append(rightRule)
+            else:
+                for B, C in self.NT_To_NT_Rules[NT]:
+                    for i in range(1, length):
+                        weight = counts[B][i] * counts[C][length - i]
+                        if weight:
+                            total += weight
+                            cumulative.append(total)
+                            choices.append((B, i, C, length - i))
+            self.derivationChoices[key] = (cumulative, choices)
+        return self.derivationChoices[key]
+
+    def sampleWord(self, length):
+        # равномерно по выводам длины length (для однозначной грамматики — по словам), без CYK;
+        # None, если слов такой длины нет (в том числе когда язык пуст)
+        if length < 1 or not self.countDerivations(length):
+            return None
+        word = []
+        stack = [(self.startingNT, length)]
+        while stack:
+            NT, L = stack.pop()
+            cumulative, choices = self.derivationChoice(NT, L)
+            choice = choices[bisect_right(cumulative, random.randrange(cumulative[-1]))]
+            if L == 1:
+                word.append(choice)
+            else:
+                B, i, C, j = choice
+                stack.append((C, j))
+                stack.append((B, i))
+        return ''.join(word)
+
+    def generateBalanced(self, n=100, length=10, allTerminals=True, maxAttempts=100):
+        # половина слов — члены языка длины length из sampleWord, вторая половина — их мутации
+        # в одном символе, которые CYKBitset не принимает. None без записи файла, если язык пуст
+        if self.startingNT not in self.allNTs:
+            return None
+        terminals = list(string.ascii_lowercase) if allTerminals else sorted(self.terminals)
+        positives = [self.sampleWord(length) for _ in range(n - n // 2)]
+        assert n == 0 or positives[0] is not None, f"No words of length {length}!"
+
+        negatives = []
+        attempts = 0
+        while len(negatives) < n // 2 and attempts < maxAttempts * n:
+            attempts += 1
+            word = list(random.choice(positives))
+            word[random.randrange(length)] = random.choice(terminals)
+            word = ''.join(word)
+            if not self.CYKBitset(word):
+                negatives.append(word)
+
+        tests = [(word, 1) for word in positives] + [(word, 0) for word in negatives]
+        random.shuffle(tests)
+        with open("tests.txt", 'w') as f:
+            f.writelines([f'{word} {mark}\n' for word, mark in tests])
+
+    def makeBigramTable(self, terminals):
+        # символы слова нумеруются, последователи каждого символа лежат в кортеже,
+        # чтобы в цикле генерации не строить list(set) на каждом шаге; кортежи берутся
+        # прямо из строк матрицы биграмм
+        symbols = sorted(set(terminals) | set(self.bigramSymbols))
+        ids = {symbol: i for i, symbol in enumerate(symbols)}
+        rowIds = {symbol: i for i, symbol in enumerate(self.bigramSymbols)}
+        bigramIds = [ids[symbol] for symbol in self.bigramSymbols]
+        successors = [tuple(bigramIds[j] for j in bitIndexes(self.bigramRows[rowIds[symbol]]))
+                      if symbol in rowIds else () for symbol in symbols]
+        return symbols, ids, successors
+
+    def randomWords(self, n, terminals, randomTerminalChance, randomStopChance, batchSize=4096):
+        symbols, ids, successors = self.makeBigramTable(terminals)
+        randomIds = [ids[t] for t in terminals]
+        startingIds = [ids[t] for t in sorted(self.first[self.startingNT])]
+        stopChance = randomTerminalChance + randomStopChance
+        randoms = []
+        for _ in range(n):
+            current = random.choice(startingIds)
+            word = [symbols[current]]
+            while successors[current]:
+                if not randoms:
+                    randoms = [random.random() for _ in range(batchSize)]
+                # одно случайное число выбирает и действие, и символ
+                r = randoms.pop()
+                if r < randomTerminalChance:
+                    current = randomIds[min(int(r / randomTerminalChance * len(randomIds)), len(randomIds) - 1)]
+                elif r < stopChance:
+                    break
+                else:
+                    followers = successors[current]
+                    current = followers[min(int((r - stopChance) / (1 - stopChance) * len(followers)),
+                                            len(followers) - 1)]
+                word.append(symbols[current])
+            yield ''.join(word)
+
     def generate(self,
                  n=100,
                  testing=True,
                  allTerminals=True,
                  randomTerminalChance=0.1,
-                 randomStopChance=0.15):
+                 randomStopChance=0.15,
+                 labeling='bitset',
+                 workers=None,
+                 chunkSize=10000):
         assert randomTerminalChance + randomStopChance <= 1, "Chances must sum up to 1!"
 
-        terminals = list(self.terminals.copy())
+        terminals = sorted(self.terminals)
         if allTerminals:
-            terminals = string.ascii_lowercase
+            terminals = list(string.ascii_lowercase)
 
-        startingTerminals = list(self.first[self.startingNT])
+        words = self.randomWords(n, terminals, randomTerminalChance, randomStopChance)
+        chunks = iter(lambda: list(islice(words, chunkSize)), [])
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1 or n <= chunkSize:
+            labeled = ((chunk, self.label(chunk, labeling)) for chunk in chunks)
+        else:
+            labeled = self.labelParallel(chunks, labeling, workers)
 
         if testing:
             verifyFile = open("verify_file.txt", 'w')
             positiveGenerations = []
 
+        i = 0
         with open("tests.txt", 'w') as f:
-            for i in range(n):
-                current = random.choice(startingTerminals)
-                while self.bigramms[current[-1]]:
-                    r = random.random()
-                    if r < randomTerminalChance:
-                        current += random.choice(terminals)
-                    elif r < randomTerminalChance + randomStopChance:
-                        break
-                    else:
-                        current += random.choice(list(self.bigramms[current[-1]]))
-                belongsToLanguage = self.CYK(current)
-                f.write(f'{current} {1 if belongsToLanguage else 0}\n')
+            for chunk, labels in labeled:
+                f.writelines([f'{word} {1 if label else 0}\n' for word, label in zip(chunk, labels)])
                 if testing:
-                    verifyFile.write(f'{current}\n')
-                    if belongsToLanguage:
-                        positiveGenerations.append(str(i + 1))
+                    verifyFile.writelines([f'{word}\n' for word in chunk])
+                    positiveGenerations += [str(i + j + 1) for j, label in enumerate(labels) if label]
+                i += len(chunk)
 
         if testing:
+            verifyFile.close()
             print(' '.join(positiveGenerations))
+
+    def label(self, words, labeling='bitset'):
+        belongs = {'cyk': self.CYK, 'bitset': self.CYKBitset, 'earley': self.Earley}[labeling]
+        return [belongs(word) for word in words]
+
+    def labelParallel(self, chunks, labeling, workers):
+        # разметка кусками в пуле процессов, в работе не больше 2 * workers кусков, порядок сохраняется
+        with ProcessPoolExecutor(workers, initializer=initLabelWorker, initargs=(self,)) as pool:
+            inFlight = deque()
+            for chunk in chunks:
+                inFlight.append((chunk, pool.submit(labelChunk, chunk, labeling)))
+                if len(inFlight) >= 2 * workers:
+                    chunk, future = inFlight.popleft()
+                    yield chunk, future.result()
+            while inFlight:
+                chunk, future = inFlight.popleft()
+                yield chunk, future.result()
+
+
+labelGrammar = None
+
+
+def initLabelWorker(grammar):
+    global labelGrammar
+    labelGrammar = grammar
+
+
+def labelChunk(words, labeling):
+    return labelGrammar.label(words, labeling)
@@ -0,0 +1,267 @@
+from sppf import ForestNode, PackedNode, ParseForest
+
+ACCEPT = (None, 0, None)  # ребро корня: снятие корня означает разбор всего префикса
+
+
+def findNullable(parseTable):
+    rulesByNT = {}
+    for (NT, _), rules in parseTable.items():
+        rulesByNT.setdefault(NT, set([])).update(map(tuple, rules))
+    nullable = set([])
+    changed = True
+    while changed:
+        changed = False
+        for NT, rules in rulesByNT.items():
+            if NT not in nullable and any(all(s in nullable for s in rule) for rule in rules):
+                nullable.add(NT)
+                changed = True
+    return nullable
+
+
+class GSSNode:
+    # Узел графового стека (GSS): нетерминал NT, начатый на позиции pos.
+    # Рёбра ведут к узлам-родителям и помечены позицией возврата (rule, dot).
+    __slots__ = ('NT', 'pos', 'edges')
+
+    def __init__(self, NT, pos):
+        self.NT = NT
+        self.pos = pos
+        self.edges = set([])
+
+
+class GLLRecognizer:
+    # GLL-разбор по той же таблице parseTable, что и checkWord. Вместо копирования стека на каждую
+    # альтернативу все стеки хранятся в одном графе: узел (NT, pos) создаётся один раз,
+    # а дескрипторы (rule, dot, node) на каждой позиции обрабатываются не больше одного раза,
+    # поэтому в худшем случае разбор кубический.
+    #
+    # Позиции обрабатываются строго по порядку, поэтому словарь узлов нужен только для текущей
+    # позиции, а старые узлы живут, пока на них ссылаются дескрипторы или рёбра.
+    # Благодаря этому вход можно подавать кусками через feed(chunk) и закончить finish():
+    # из входа хранится только окно из k символов после текущей позиции.
+    # Если нетерминал стоит последним в правиле, новый узел сразу наследует рёбра родителя
+    # (хвостовой вызов), так что правая рекурсия не накапливает цепочку узлов.
+    def __init__(self, parseTable, terminals, allNTs, startingNT, k):
+        self.parseTable = parseTable
+        self.terminals = terminals
+        self.allNTs = allNTs
+        self.startingNT = startingNT
+        self.k = k
+        self.reset()
+
+    def reset(self):
+        self.pos = 0
+        self.root = None
+        self.pending = set([])
+        self.accepted = False
+        self.buffer = ''
+        self.offset = 0
+        self.dead = False
+
+    def predict(self, NT, node, lookahead, add):
+        for rule in self.parseTable.get((NT, lookahead), ()):
+            add((rule, 0, node))
+
+    def processPosition(self, lookahead):
+        # lookahead == word[pos:pos + k]; после вызова pending содержит дескрипторы позиции pos + 1,
+        # accepted показывает, снимался ли корень на позиции pos
+        pos = self.pos
+        current = list(self.pending)
+        seen = self.pending
+        nextPending = set([])
+        nodes = {}
+        popped = set([])
+        self.accepted = False
+
+        def add(descriptor):
+            if descriptor is ACCEPT:
+                self.accepted = True
+            elif descriptor not in seen:
+                seen.add(descriptor)
+                current.append(descriptor)
+
+        if self.root is None:
+            self.root = GSSNode(self.startingNT, pos)
+            self.root.edges.add(ACCEPT)
+            nodes[self.startingNT] = self.root
+            self.predict(self.startingNT, self.root, lookahead, add)
+
+        char = lookahead[:1]
+        terminals = self.terminals
+        allNTs = self.allNTs
+        while current:
+            rule, dot, node = current.pop()
+            if dot == len(rule):
+                if node.pos == pos:
+                    popped.add(node)
+                for edge in node.edges:
+                    add(edge)
+                continue
+
+            symbol = rule[dot]
+            if symbol in terminals:
+                if symbol == char:
+                    nextPending.add((rule, dot + 1, node))
+            elif symbol in allNTs:
+                if dot + 1 == len(rule) and node.pos < pos:
+                    # рёбра узла с прошлых позиций уже не меняются
+                    edges = node.edges
+                else:
+                    edges = ((rule, dot + 1, node),)
+                child = nodes.get(symbol)
+                if child is None:
+                    child = nodes[symbol] = GSSNode(symbol, pos)
+                    child.edges.update(edges)
+                    self.predict(symbol, child, lookahead, add)
+                else:
+                    for edge in edges:
+                        if edge not in child.edges:
+                            child.edges.add(edge)
+                            if child in popped:
+                                add(edge)
+            else:
+                # неизвестный символ пропускается так же, как в checkWord
+                add((rule, dot + 1, node))
+
+        self.pending = nextPending
+        self.pos = pos + 1
+
+    def feed(self, chunk):
+        if self.dead:
+            return
+        self.buffer = self.buffer[self.offset:] + chunk
+        self.offset = 0
+        # позиция обрабатывается, как только за ней известны k символов
+        while len(self.buffer) - self.offset >= self.k:
+            self.processPosition(self.buffer[self.offset:self.offset + self.k])
+            self.offset += 1
+            if not self.pending:
+                self.dead = True
+                self.buffer = ''
+                self.offset = 0
+                return
+
+    def finish(self) -> bool:
+        # оставшиеся позиции с укороченным lookahead, последняя — с пустым (конец слова)
+        while not self.dead:
+            lookahead = self.buffer[self.offset:self.offset + self.k]
+            self.processPosition(lookahead)
+            if not lookahead:
+                return self.accepted
+            self.offset += 1
+            if not self.pending:
+                self.dead = True
+        return False
+
+    def recognize(self, word) -> bool:
+        self.reset()
+        self.feed(word)
+        return self.finish()
+
+
+class GLLParser(GLLRecognizer):
+    # GLL-разбор с построением общего упакованного леса (SPPF, sppf.py) по схеме Скотта и Джонстона:
+    # дескриптор дополнительно хранит узел леса для уже разобранного начала правила,
+    # рёбра GSS — узел леса родителя. Хвостовые вызовы не сокращаются, иначе потеряются узлы леса.
+    def __init__(self, parseTable, terminals, allNTs, startingNT, k):
+        self.nullable = findNullable(parseTable)
+        super().__init__(parseTable, terminals, allNTs, startingNT, k)
+
+    def reset(self):
+        super().reset()
+        self.forestNodes = {}
+        self.forestRoot = None
+
+    def forestNode(self, label, left, right):
+        key = (label, left, right)
+        node = self.forestNodes.get(key)
+        if node is None:
+            node = self.forestNodes[key] = ForestNode(label, left, right)
+        return node
+
+    def packNode(self, NT, rule, dot, w, z):
+        # узел леса для rule[:dot] по левой части w (None, если её нет) и очередному символу z
+        if dot == 1 and dot < len(rule) and rule[0] not in self.nullable:
+            return z
+        label = NT if dot == len(rule) else (rule, dot)
+        left = z.left if w is None else w.left
+        node = self.forestNode(label, left, z.right)
+        pivot = z.left
+        if (rule, dot, pivot) not in node.packed:
+            node.packed[(rule, dot, pivot)] = PackedNode(rule, pivot, w, z)
+        return node
+
+    def processPosition(self, lookahead):
+        pos = self.pos
+        current = list(self.pending)
+        seen = self.pending
+        nextPending = set([])
+        nodes = {}
+        popped = {}
+        self.accepted = False
+
+        def add(descriptor):
+            if descriptor not in seen:
+                seen.add(descriptor)
+                current.append(descriptor)
+
+        def ret(edge, z):
+            NT, rule, dot, parent, w = edge
+            if rule is None:
+                self.accepted = True
+                self.forestRoot = z
+            else:
+                add((NT, rule, dot, parent, self.packNode(NT, rule, dot, w, z)))
+
+        def predict(NT, node):
+            for rule in self.parseTable.get((NT, lookahead), ()):
+                add((NT, rule, 0, node, None))
+
+        if self.root is None:
+            self.root = GSSNode(self.startingNT, pos)
+            self.root.edges.add((self.startingNT, None, 0, None, None))
+            nodes[self.startingNT] = self.root
+            predict(self.startingNT, self.root)
+
+        char = lookahead[:1]
+        terminals = self.terminals
+        allNTs = self.allNTs
+        while current:
+            NT, rule, dot, node, w = current.pop()
+            if dot == len(rule):
+                if not rule:
+                    w = self.packNode(NT, rule, 0, None, self.forestNode(None, pos, pos))
+                if node.pos == pos:
+                    popped.setdefault(node, []).append(w)
+                for edge in node.edges:
+                    ret(edge, w)
+                continue
+
+            symbol = rule[dot]
+            if symbol in terminals:
+                if symbol == char:
+                    leaf = self.forestNode(symbol, pos, pos + 1)
+                    nextPending.add((NT, rule, dot + 1, node, self.packNode(NT, rule, dot + 1, w, leaf)))
+            elif symbol in allNTs:
+                edge = (NT, rule, dot + 1, node, w)
+                child = nodes.get(symbol)
+                if child is None:
+                    child = nodes[symbol] = GSSNode(symbol, pos)
+                    child.edges.add(edge)
+                    predict(symbol, child)
+                elif edge not in child.edges:
+                    child.edges.add(edge)
+                    for z in popped.get(child, ()):
+                        ret(edge, z)
+            else:
+                # неизвестный символ пропускается так же, как в checkWord, в лесу он — пустой лист
+                add((NT, rule, dot + 1, node, self.packNode(NT, rule, dot + 1, w, self.forestNode(symbol, pos, pos))))
+
+        self.pending = nextPending
+        self.pos = pos + 1
+
+    def parse(self, word):
+        # ParseForest со всеми деревьями разбора или None, если слово не выводится
+        if not self.recognize(word):
+            return None
+        return ParseForest(self.forestRoot)
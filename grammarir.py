@@ -0,0 +1,201 @@
+from array import array
+
+# Разобранная грамматика, общая для GeneratorPDA и fuzz.Grammar: символы заменяются номерами,
+# правила хранятся в плоских массивах. Нетерминалы левых частей получают номера 0..nNTs-1
+# в порядке появления, правила идут подряд по нетерминалам, так что правила нетерминала A —
+# это ntRuleOffsets[A]..ntRuleOffsets[A + 1]. Нетерминал, у которого нет правил, помечается OTHER_KIND.
+# По массивам ищется только стартовый нетерминал. Алгоритмы GeneratorPDA и fuzz.Grammar меняют
+# правила на месте (правки таблицы, HNFTransform), поэтому берут свои списки символов через ntToRules().
+
+NT_KIND, TERMINAL_KIND, OTHER_KIND = 0, 1, 2  # OTHER_KIND: строки lookahead и неизвестные символы
+
+
+def isNT(symbol: str) -> bool:
+    return not symbol[0].islower()
+
+
+def parseRule(s: str) -> list:
+    newList = []
+    i = 0
+    while i < len(s):
+        if s[i] == '[':
+            start = i
+            while s[i] != ']':
+                i += 1
+            newList.append(s[start:i + 1])
+        else:
+            if i < len(s) - 1 and s[i + 1].isnumeric():
+                newList.append(s[i:i + 2])
+                i += 1
+            else:
+                newList.append(s[i])
+        i += 1
+
+    return newList
+
+
+def parseGrammar(grammar_str: str) -> dict:
+    NT_To_Rules = {}
+    for line in grammar_str.split('\n'):
+        if not line.strip():
+            continue
+        line_splited = list(map(lambda r: r.replace(' ', ''), line.strip().split('->')))
+        NT = line_splited[0]
+        rightRule = list(map(lambda l: l.strip(), line_splited[1].split('|')))
+        NT_To_Rules.setdefault(NT, []).extend(map(parseRule, rightRule))
+    return NT_To_Rules
+
+
+class CompiledGrammar:
+    def __init__(self, symbols, kinds, nNTs, ntRuleOffsets, ruleOffsets, ruleSymbols, startId, text=''):
+        self.symbols = symbols
+        self.ids = {symbol: i for i, symbol in enumerate(symbols)}
+        self.kinds = kinds
+        self.nNTs = nNTs
+        self.ntRuleOffsets = ntRuleOffsets
+        self.ruleOffsets = ruleOffsets
+        self.ruleSymbols = ruleSymbols
+        self.startId = startId
+        self.text = text
+
+    @classmethod
+    def fromRules(cls, NT_To_Rules, startingNT=None, text=''):
+        symbols = []
+        kinds = bytearray()
+        ids = {}
+
+        def intern(symbol):
+            if symbol not in ids:
+                ids[symbol] = len(symbols)
+                symbols.append(symbol)
+                kinds.append(NT_KIND if symbol in NT_To_Rules else OTHER_KIND if isNT(symbol) else TERMINAL_KIND)
+            return ids[symbol]
+
+        for NT in NT_To_Rules:
+            intern(NT)
+        startId = intern(startingNT) if startingNT else None
+        ntRuleOffsets = array('I', [0])
+        ruleOffsets = array('I', [0])
+        ruleSymbols = array('I')
+        for rightRules in NT_To_Rules.values():
+            for rightRule in rightRules:
+                ruleSymbols.extend(intern(symbol) for symbol in rightRule)
+                ruleOffsets.append(len(ruleSymbols))
+            ntRuleOffsets.append(len(ruleOffsets) - 1)
+
+        grammar = cls(symbols, kinds, len(NT_To_Rules), ntRuleOffsets, ruleOffsets, ruleSymbols, startId, text)
+        if startId is None:
+            grammar.startId = grammar.findStartingNT()
+        return grammar
+
+    @classmethod
+    def fromText(cls, grammar_str, startingNT=None):
+        return cls.fromRules(parseGrammar(grammar_str), startingNT, grammar_str)
+
+    @property
+    def startingNT(self):
+        return self.symbols[self.startId]
+
+    def NTs(self) -> list:
+        return self.symbols[:self.nNTs]
+
+    def terminals(self) -> set:
+        return set(symbol for symbol, kind in zip(self.symbols, self.kinds) if kind == TERMINAL_KIND)
+
+    def ruleIds(self, i) -> array:
+        return self.ruleSymbols[self.ruleOffsets[i]:self.ruleOffsets[i + 1]]
+
+    def ruleIdsOfNT(self, NT):
+        return range(self.ntRuleOffsets[NT], self.ntRuleOffsets[NT + 1])
+
+    def ntToRules(self) -> dict:
+        # свежие списки символов: потребители (HNFTransform, правки таблицы) меняют их на месте
+        symbols = self.symbols
+        return {symbols[NT]: [[symbols[s] for s in self.ruleIds(i)] for i in self.ruleIdsOfNT(NT)]
+                for NT in range(self.nNTs)}
+
+    def successors(self, NT) -> list:
+        if NT >= self.nNTs:
+            return []
+        kinds = self.kinds
+        rules = self.ruleSymbols[self.ruleOffsets[self.ntRuleOffsets[NT]]:self.ruleOffsets[self.ntRuleOffsets[NT + 1]]]
+        return list(set([s for s in rules if kinds[s] != TERMINAL_KIND]))
+
+    def findStartingNT(self):
+        # нетерминал, из которого достижимо больше всего нетерминалов (при равенстве — первый по порядку).
+        # Из предка достижимо всё, что из потомка, и ещё он сам, поэтому лучший нетерминал лежит
+        # в компоненте сильной связности без входящих рёбер. Компоненты находит Тарьян на явном стеке,
+        # затем из каждой такой компоненты делается один обход в ширину.
+        nSymbols = len(self.symbols)
+        index = [-1] * nSymbols
+        low = [0] * nSymbols
+        onStack = bytearray(nSymbols)
+        component = [-1] * nSymbols
+        nComponents = 0
+        sccStack = []
+        successors = [self.successors(NT) for NT in range(nSymbols)]
+        counter = 0
+        for root in range(self.nNTs):
+            if index[root] != -1:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            sccStack.append(root)
+            onStack[root] = 1
+            frames = [(root, iter(successors[root]))]
+            while frames:
+                NT, pending = frames[-1]
+                for child in pending:
+                    if index[child] == -1:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        sccStack.append(child)
+                        onStack[child] = 1
+                        frames.append((child, iter(successors[child])))
+                        break
+                    if onStack[child] and index[child] < low[NT]:
+                        low[NT] = index[child]
+                else:
+                    frames.pop()
+                    if frames and low[NT] < low[frames[-1][0]]:
+                        low[frames[-1][0]] = low[NT]
+                    if low[NT] == index[NT]:
+                        while True:
+                            member = sccStack.pop()
+                            onStack[member] = 0
+                            component[member] = nComponents
+                            if member == NT:
+                                break
+                        nComponents += 1
+
+        entered = bytearray(nComponents)
+        for NT in range(self.nNTs):
+            for child in successors[NT]:
+                if component[child] != component[NT]:
+                    entered[component[child]] = 1
+
+        counts = [0] * nComponents
+        visitedFrom = [-1] * nSymbols  # компонента, обход из которой уже побывал в символе
+        maxVisited = (0, 0)
+        for NT in range(self.nNTs):
+            c = component[NT]
+            if entered[c]:
+                continue
+            if not counts[c]:
+                visitedFrom[NT] = c
+                queue = [NT]
+                for current in queue:
+                    for child in successors[current]:
+                        if visitedFrom[child] != c:
+                            visitedFrom[child] = c
+                            queue.append(child)
+                counts[c] = len(queue)
+            if counts[c] > maxVisited[1]:
+                maxVisited = (NT, counts[c])
+        return maxVisited[0]
+
+
+def compileGrammar(startingNT=None, path='grammar.txt'):
+    with open(path, 'r') as file:
+        grammar_str = file.read()
+    return CompiledGrammar.fromText(grammar_str, startingNT)
@@ -0,0 +1,70 @@
+class KPrefixCodec:
+    # Префикс длины <= k хранится одним int: каждый символ терминала получает id >= 1
+    # и занимает self.bits бит, первый символ в старших битах. Пустая строка (epsilon) == 0,
+    # длина префикса восстанавливается по bit_length, поэтому хранить её отдельно не нужно.
+    def __init__(self, terminals, k):
+        self.k = k
+        self.chars = [''] + sorted(set(''.join(terminals)))
+        self.ids = {c: i for i, c in enumerate(self.chars) if c}
+        self.bits = max(1, (len(self.chars) - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+
+    def length(self, code: int) -> int:
+        return (code.bit_length() + self.bits - 1) // self.bits
+
+    def encode(self, s: str) -> int:
+        code = 0
+        for c in s[:self.k]:
+            code = (code << self.bits) | self.ids[c]
+        return code
+
+    def decode(self, code: int) -> str:
+        chars = []
+        while code:
+            chars.append(self.chars[code & self.mask])
+            code >>= self.bits
+        return ''.join(reversed(chars))
+
+    def decodeSet(self, codes) -> set:
+        return set(map(self.decode, codes))
+
+    def truncated(self, codes, free: int) -> set:
+        # пары (первые free символов r, сдвиг для приписывания их справа)
+        pairs = set([])
+        for r in codes:
+            extra = self.length(r) - free
+            if extra > 0:
+                r >>= extra * self.bits
+                pairs.add((r, free * self.bits))
+            else:
+                pairs.add((r, (free + extra) * self.bits))
+        return pairs
+
+    def concat(self, left, right) -> set:
+        if not left or not right:
+            return set([])
+
+        result = set([])
+        pairsByFree = {}
+        for x in left:
+            free = self.k - self.length(x)
+            if free == 0:
+                # x уже длины k, правая часть на него не влияет
+                result.add(x)
+                continue
+            pairs = pairsByFree.get(free)
+            if pairs is None:
+                pairs = pairsByFree[free] = self.truncated(right, free)
+            result.update([(x << shift) | r for r, shift in pairs])
+        return result
+
+    def concatAll(self, sets) -> set:
+        result = {0}
+        for codes in sets:
+            if all(self.length(x) == self.k for x in result):
+                # дальше все префиксы уже полные, осталось проверить только пустоту множеств
+                return result if all(sets) else set([])
+            result = self.concat(result, codes)
+            if not result:
+                return result
+        return result
@@ -0,0 +1,102 @@
+from array import array
+
+EMPTY = ()
+
+
+class LookaheadTable:
+    # Плотная таблица разбора только для чтения. Строки lookahead лежат в боре: узел — массив детей
+    # по номерам символов (0 — символ не из алфавита, ребёнка у него нет), у узла, на котором
+    # заканчивается lookahead из таблицы, есть строка. Ячейка (строка, номер NT) хранит номер кортежа
+    # правил в ruleLists, 0 — пустой кортеж. Строки для всех позиций слова находятся один раз
+    # при кодировании (encode) без срезов и хеширования строк, а промах ничего не создаёт,
+    # так что размер таблицы не зависит от входов.
+    def __init__(self, parseTable, k, terminals=()):
+        self.k = k
+        entries = [(NT, lookahead, rules) for (NT, lookahead), rules in parseTable.items() if rules]
+        self.chars = sorted(set(''.join(lookahead for _, lookahead, _ in entries)) | set(terminals))
+        self.charIds = {c: i + 1 for i, c in enumerate(self.chars)}
+        # номера терминалов грамматики: по ним символ стека сравнивается с закодированным входом
+        self.terminalIds = {c: self.charIds[c] for c in terminals}
+        self.width = len(self.chars) + 1
+        self.ntIds = {NT: i for i, NT in enumerate(sorted(set(NT for NT, _, _ in entries)))}
+
+        self.children = array('i', [-1] * self.width)
+        self.rows = array('i', [-1])
+        rowsCount = 0
+        for _, lookahead, _ in entries:
+            node = 0
+            for c in lookahead:
+                child = self.children[node * self.width + self.charIds[c]]
+                if child < 0:
+                    child = len(self.rows)
+                    self.children[node * self.width + self.charIds[c]] = child
+                    self.children.extend([-1] * self.width)
+                    self.rows.append(-1)
+                node = child
+            if self.rows[node] < 0:
+                self.rows[node] = rowsCount
+                rowsCount += 1
+
+        # одинаковые наборы правил хранятся один раз
+        self.ruleLists = [EMPTY]
+        self.reversedRuleLists = [EMPTY]
+        listIds = {}
+        self.entries = array('I', [0] * (rowsCount * len(self.ntIds)))
+        for NT, lookahead, rules in entries:
+            rules = tuple(tuple(rule) for rule in rules)
+            if rules not in listIds:
+                listIds[rules] = len(self.ruleLists)
+                self.ruleLists.append(rules)
+                self.reversedRuleLists.append(tuple(rule[::-1] for rule in rules))
+            row = self.rowOf(lookahead)
+            self.entries[row * len(self.ntIds) + self.ntIds[NT]] = listIds[rules]
+
+    def rowOf(self, lookahead):
+        node = 0
+        for c in lookahead:
+            node = self.children[node * self.width + self.charIds.get(c, 0)]
+            if node < 0:
+                return -1
+        return self.rows[node]
+
+    def encode(self, word):
+        return EncodedWord(self, word)
+
+    def rules(self, NT, row):
+        NTId = self.ntIds.get(NT)
+        if row < 0 or NTId is None:
+            return EMPTY
+        return self.ruleLists[self.entries[row * len(self.ntIds) + NTId]]
+
+    def reversedRules(self, NT, row):
+        # правила в порядке заталкивания в стек
+        NTId = self.ntIds.get(NT)
+        if row < 0 or NTId is None:
+            return EMPTY
+        return self.reversedRuleLists[self.entries[row * len(self.ntIds) + NTId]]
+
+
+class EncodedWord:
+    # Слово, один раз переведённое в номера символов таблицы (codes, 0 — символ не из алфавита),
+    # и строка таблицы для lookahead каждой позиции (rows[pos] для word[pos:pos + k], -1 — нет строки).
+    # Конфигурации разбора хранят только позицию, массивы общие для всех стеков и не копируются.
+    __slots__ = ('word', 'codes', 'rows')
+
+    def __init__(self, table, word):
+        self.word = word
+        charIds, children, width, tableRows = table.charIds, table.children, table.width, table.rows
+        self.codes = array('H', [charIds.get(c, 0) for c in word])
+        n = len(word)
+        self.rows = array('i', [-1] * (n + 1))
+        codes = self.codes
+        for pos in range(n + 1):
+            node = 0
+            for i in range(pos, min(pos + table.k, n)):
+                node = children[node * width + codes[i]]
+                if node < 0:
+                    break
+            if node >= 0:
+                self.rows[pos] = tableRows[node]
+
+    def __len__(self):
+        return len(self.codes)
@@ -1,13 +1,21 @@
-import fuzz
 from collections import defaultdict, deque
-import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import reduce
+from itertools import islice
+from operator import or_
+import os
+import tempfile
+import time
+from earley import EarleyRecognizer
 from fuzz import Grammar
-
-sys.setrecursionlimit(10000)
-
-
-def isNT(symbol: str) -> bool:
-    return not symbol[0].islower()
+from gll import GLLParser, GLLRecognizer
+from grammarir import CompiledGrammar, NT_KIND, TERMINAL_KIND, compileGrammar, isNT, parseRule
+from kprefix import KPrefixCodec
+from lookaheadtable import EncodedWord, LookaheadTable
+from recognizergen import generateRecognizer, loadRecognizer, recognizerDigest, writeRecognizer
+from tablecache import CompiledTable, grammarDigest, textDigest, writeCompiledTable
+from yieldanalysis import YieldAnalysis
 
 
 def getSetOFNTs(rule: list) -> set:
@@ -23,11 +31,22 @@ class GeneratorPDA:
         self.terminals = set([])
         self.startingNT = None
         self.counter = 1
+        self.compiledGrammar = None
         self.k = k_param
 
         self.first = defaultdict(set)
         self.follow = defaultdict(set)
+        self.codec = None
+        self.firstCodes = defaultdict(set)
+        self.followCodes = defaultdict(set)
+        self.suffixFirst = {}
         self.parseTable = defaultdict(list)
+        self.lookaheadTable = None
+        self.yieldAnalysis = None
+        self.ruleLengths = {}
+        self.recognizer = None
+        self.editDepth = 0  # вложенность batchEdits
+        self.editedDigest = None  # метка таблицы, ещё не записанной после правок в batchEdits
 
         self.PDAstates = []
         self.PDAstart = []
@@ -40,37 +59,15 @@ class GeneratorPDA:
         self.allready_read = ''
 
     def readGrammar(self, startingNT=None):
-        with open('grammar.txt', 'r') as file:
-            self.grammar_str = file.read()
-            lines = self.grammar_str.split('\n')
-
-        for line in lines:
-            line_splited = list(map(lambda r: r.replace(' ', ''), line.strip().split('->')))
-            NT = line_splited[0]
-            rightRule = list(map(lambda l: l.strip(), line_splited[1].split('|')))
-            self.NT_To_Rules[NT] += list(map(self.parseRule, rightRule))
+        self.useCompiledGrammar(compileGrammar(startingNT))
 
+    def useCompiledGrammar(self, grammar):
+        # правила копируются из общей скомпилированной грамматики (grammarir.py)
+        self.compiledGrammar = grammar
+        self.grammar_str = grammar.text
+        self.NT_To_Rules = defaultdict(list, grammar.ntToRules())
         self.updateGrammar()
-
-        self.startingNT = startingNT
-        if not self.startingNT:
-            self.startingNT = self.findStartingNT()
-
-    def findStartingNT(self):
-        maxVisited = ("", 0)
-        for NT in self.allNTs:
-            visited = set([])
-            self.findStartingNTRecursion(NT, visited)
-            if len(visited) > maxVisited[1]:
-                maxVisited = (NT, len(visited))
-        return maxVisited[0]
-
-    def findStartingNTRecursion(self, NT1, visited):
-        visited.add(NT1)
-        for rightRule in self.NT_To_Rules[NT1]:
-            for NT2 in fuzz.getSetOFNTs(rightRule):
-                if NT2 not in visited:
-                    self.findStartingNTRecursion(NT2, visited)
+        self.startingNT = grammar.startingNT
 
     def updateGrammar(self):
         self.rules = []
@@ -79,111 +76,306 @@ class GeneratorPDA:
                 self.rules.append((NT, rightRule))
         self.allNTs = set(self.NT_To_Rules.keys())
 
-        self.terminals = set([])
-        for _, rightRule in self.rules:
-            self.terminals = self.terminals.union(set([symbol for symbol in rightRule if not isNT(symbol)]))
-
-    def parseRule(self, s: str) -> list:
-        newList = []
-        i = 0
-        while i < len(s):
-            if s[i] == '[':
-                start = i
-                while s[i] != ']':
-                    i += 1
-                newList.append(s[start:i + 1])
-            else:
-                if i < len(s) - 1 and s[i + 1].isnumeric():
-                    newList.append(s[i:i + 2])
-                    i += 1
-                else:
-                    newList.append(s[i])
-            i += 1
-
-        return newList
+        self.terminals = set([symbol for _, rightRule in self.rules for symbol in rightRule if not isNT(symbol)])
 
     def getFirstK(self, str):
         return str[:self.k]
 
-    def FirstK_concatStringSets(self, sets):
-        if len(sets) == 1:
-            return sets[0]
-
-        if sets[0] == set([]):
-            return set([])
-        else:
-            result = sets[0]
-
-        if sets[1] == set([]):
-            return set([])
-
-        new_result = set([])
-        for x in result:
-            new_result = new_result.union(set(map(lambda r: self.getFirstK(x + r), sets[1])))
-        result = new_result
-
-        return self.FirstK_concatStringSets([result] + sets[2:])
-
     def createFirst(self):
-        new_first = defaultdict(set)
+        self.codec = KPrefixCodec(self.terminals, self.k)
+        self.firstCodes = defaultdict(set)
         for NT in self.allNTs:
-            new_first[NT] = set([])
+            self.firstCodes[NT] = set([])
 
         for T in self.terminals:
-            new_first[T] = {T}
-
-        while not (self.first == new_first):
-            for key, value in new_first.items():
-                self.first[key] = value
-
-            for NT, rule in self.rules:
-                new_first[NT] = new_first[NT].union(
-                    self.FirstK_concatStringSets([new_first[symbol] for symbol in rule]))
+            self.firstCodes[T] = {self.codec.encode(T)}
+
+        self.runWorklist(range(len(self.rules)), self.updateFirstByRule, self.firstDependentRules())
+        self.first = self.decodeSets(self.firstCodes)
+        self.createSuffixFirst()
+
+    def firstDependentRules(self):
+        # правило пересчитывается только когда изменился first одного из символов его правой части
+        dependentRules = defaultdict(list)
+        for i, (_, rule) in enumerate(self.rules):
+            for symbol in set(rule):
+                dependentRules[symbol].append(i)
+        return dependentRules
+
+    def createSuffixFirst(self):
+        # suffixFirst[rule][i] == first_k(rule[i:]), одинаковые правые части разных NT считаются один раз
+        self.suffixFirst = {}
+        for _, rule in self.rules:
+            rule = tuple(rule)
+            if rule not in self.suffixFirst:
+                self.suffixFirst[rule] = self.ruleSuffixFirst(rule)
+
+    def ruleSuffixFirst(self, rule):
+        suffixes = [{0}]
+        for symbol in reversed(rule):
+            suffixes.append(self.codec.concat(self.firstCodes[symbol], suffixes[-1]))
+        suffixes.reverse()
+        return suffixes
+
+    def updateFirstByRule(self, i):
+        NT, rule = self.rules[i]
+        added = self.codec.concatAll([self.firstCodes[symbol] for symbol in rule]) - self.firstCodes[NT]
+        if not added:
+            return []
+        self.firstCodes[NT] |= added
+        return [NT]
 
     def createFollow(self):
-        new_follow = defaultdict(set)
-        new_follow[self.startingNT] = {""}  # "" == epsilon
-
+        self.followCodes = defaultdict(set)
         for NT in self.allNTs:
-            if not NT == self.startingNT:
-                new_follow[NT] = set([])
-
-        while not (self.follow == new_follow):
-            for key, value in new_follow.items():
-                self.follow[key] = value
-
-            for NT, rule in self.rules:
-                for i, symbol in enumerate(rule):
-                    if isNT(symbol):
-                        new_follow[symbol] = new_follow[symbol].union(
-                            self.FirstK_concatStringSets([self.first[s] for s in rule[i + 1:]] +
-                                                         [new_follow[NT]]))
-
-    def createParseTable(self, startingNT=None):
+            self.followCodes[NT] = set([])
+        self.followCodes[self.startingNT] = {0}  # 0 == epsilon
+
+        self.runWorklist(range(len(self.rules)), self.updateFollowByRule, self.followDependentRules())
+        self.follow = self.decodeSets(self.followCodes)
+
+    def followDependentRules(self):
+        # follow символов правой части зависит только от follow левой части правила
+        dependentRules = defaultdict(list)
+        for i, (NT, _) in enumerate(self.rules):
+            dependentRules[NT].append(i)
+        return dependentRules
+
+    def updateFollowByRule(self, i):
+        NT, rule = self.rules[i]
+        suffixes = self.suffixFirst[tuple(rule)]
+        changed = []
+        for j, symbol in enumerate(rule):
+            if isNT(symbol):
+                added = self.codec.concat(suffixes[j + 1], self.followCodes[NT]) - self.followCodes[symbol]
+                if added:
+                    self.followCodes[symbol] |= added
+                    changed.append(symbol)
+        return changed
+
+    def decodeSets(self, codeSets):
+        decoded = defaultdict(set)
+        for symbol, codes in codeSets.items():
+            decoded[symbol] = self.codec.decodeSet(codes)
+        return decoded
+
+    @staticmethod
+    def runWorklist(ruleIndexes, updateRule, dependentRules):
+        # updateRule(i) возвращает символы, множества которых изменились,
+        # в очередь попадают только зависящие от них правила
+        worklist = deque(ruleIndexes)
+        inWorklist = set(worklist)
+        while worklist:
+            i = worklist.popleft()
+            inWorklist.discard(i)
+            for symbol in updateRule(i):
+                for j in dependentRules[symbol]:
+                    if j not in inWorklist:
+                        inWorklist.add(j)
+                        worklist.append(j)
+
+    def createParseTable(self, startingNT=None, useCache=True):
         self.readGrammar(startingNT)
+        digest = grammarDigest(self.grammar_str, self.k, startingNT)
+        # first и follow считаются только при перестроении таблицы
+        if useCache and self.readCompiledTable(digest=digest):
+            return
+
         self.createFirst()
         self.createFollow()
+        self.fillParseTable()
+        self.writeParseTable(digest)
+
+    def fillParseTable(self, NTs=None):
+        # NTs == None — вся таблица, иначе пересчитываются только записи этих нетерминалов
+        if NTs is None:
+            self.parseTable = defaultdict(list)
+        else:
+            for key in [key for key in self.parseTable if key[0] in NTs]:
+                del self.parseTable[key]
 
         parseTable = defaultdict(set)
         for NT, rule in self.rules:
-            for x in self.FirstK_concatStringSets([self.first[s] for s in rule] + [self.follow[NT]]):
-                parseTable[(NT, x)] = parseTable[(NT, x)].union({tuple(rule)})
+            if NTs is None or NT in NTs:
+                for x in self.codec.concat(self.suffixFirst[tuple(rule)][0], self.followCodes[NT]):
+                    parseTable[(NT, self.codec.decode(x))].add(tuple(rule))
 
         for key, value in parseTable.items():
             self.parseTable[key] = list(value)
+        if not self.editDepth:
+            self.updateLookaheadTable()
+
+    def writeParseTable(self, digest):
+        data = []
+        for key, rules in self.parseTable.items():
+            for rule in rules:
+                data.append(key[0] + ':' + key[1] + '>' + '.'.join(rule) + '\n')
+        # байты, как они лежат на диске: по их хешу readParseTable проверяет, что .bin от этого .txt
+        text = ''.join(data).encode('utf-8')
+        with open('ParseTable.txt', 'wb') as f:
+            f.write(text)
+
+        writeCompiledTable('ParseTable.bin', digest, self.k, self.startingNT, self.allNTs, self.terminals,
+                           self.parseTable, textDigest(text))
+
+    def addRule(self, NT, rule):
+        self.editRules(NT, self.currentRules(NT) + [self.toRule(rule)])
+
+    def removeRule(self, NT, rule):
+        rule = self.toRule(rule)
+        self.editRules(NT, [rightRule for rightRule in self.currentRules(NT) if rightRule != rule])
+
+    def replaceRules(self, NT, rules):
+        self.editRules(NT, [self.toRule(rule) for rule in rules])
+
+    def currentRules(self, NT):
+        if self.compiledGrammar is None:
+            # грамматика не загружалась (таблица прочитана через readParseTable), берём её из grammar.txt;
+            # пустая после правок грамматика остаётся пустой
+            self.readGrammar(self.startingNT)
+        return self.NT_To_Rules.get(NT, [])
+
+    def toRule(self, rule):
+        # правило строкой в формате grammar.txt ('aSb') или списком символов
+        if isinstance(rule, str):
+            return parseRule(rule.replace(' ', ''))
+        return list(rule)
+
+    def editRules(self, NT, rules):
+        # Правка грамматики живой таблицы: пересчитываются только first нетерминалов, из которых
+        # выводится NT, follow тех, на кого это может повлиять, и записи таблицы этих нетерминалов.
+        oldRules = self.NT_To_Rules.get(NT, [])
+        if rules:
+            self.NT_To_Rules[NT] = rules
+        else:
+            # нетерминал без правил удаляется, иначе при сериализации он получит пустое правило
+            self.NT_To_Rules.pop(NT, None)
+        self.updateGrammar()
+        self.grammar_str = '\n'.join(left + ' -> ' + ' | '.join(''.join(rule) for rule in rightRules)
+                                     for left, rightRules in self.NT_To_Rules.items())
+        self.compiledGrammar = CompiledGrammar.fromRules(self.NT_To_Rules, self.startingNT, self.grammar_str)
+
+        newChars = set(''.join(self.terminals)) - set(self.codec.ids) if self.codec else None
+        if self.codec is None or newChars:
+            # таблица была загружена из кеша или появились новые терминалы — нужен полный пересчёт
+            self.createFirst()
+            self.createFollow()
+            self.fillParseTable()
+        else:
+            firstAffected = self.updateFirst({NT})
+            followAffected = self.updateFollow(oldRules + rules, firstAffected)
+            self.fillParseTable(firstAffected | followAffected)
 
-        with open('ParseTable.txt', 'w', encoding='utf-8') as f:
-            data = ''
-            for key, rules in parseTable.items():
-                for rule in rules:
-                    rule_str = ''
-                    for term in rule:
-                        rule_str = rule_str + term + '.'
-                    rule_str = rule_str[:-1]
-                    data = data + key[0] + ':' + key[1] + '>' + rule_str + '\n'
-            f.write(data)
+        digest = grammarDigest(self.grammar_str, self.k, self.startingNT)
+        if self.editDepth:
+            self.editedDigest = digest
+        else:
+            self.writeParseTable(digest)
+
+    @contextmanager
+    def batchEdits(self):
+        # Правки внутри блока меняют first, follow и записи таблицы, а LookaheadTable, длины выводов
+        # и файлы ParseTable.txt/.bin обновляются один раз при выходе. Проверять слова внутри блока нельзя:
+        # таблица для разбора ещё старая.
+        self.editDepth += 1
+        try:
+            yield self
+        finally:
+            self.editDepth -= 1
+            if not self.editDepth and self.editedDigest is not None:
+                digest, self.editedDigest = self.editedDigest, None
+                self.updateLookaheadTable()
+                self.writeParseTable(digest)
+
+    def updateFirst(self, changed):
+        dependents = defaultdict(set)
+        for NT, rule in self.rules:
+            for symbol in rule:
+                dependents[symbol].add(NT)
+        affected = set(changed)
+        queue = list(changed)
+        while queue:
+            for NT in dependents[queue.pop()]:
+                if NT not in affected:
+                    affected.add(NT)
+                    queue.append(NT)
+
+        for NT in affected:
+            self.firstCodes[NT] = set([])
+        for T in self.terminals:
+            self.firstCodes[T] = {self.codec.encode(T)}
+        seeds = [i for i, (NT, _) in enumerate(self.rules) if NT in affected]
+        self.runWorklist(seeds, self.updateFirstByRule, self.firstDependentRules())
+        for NT in affected:
+            self.first[NT] = self.codec.decodeSet(self.firstCodes[NT])
+
+        suffixFirst = {}
+        for _, rule in self.rules:
+            rule = tuple(rule)
+            if rule in suffixFirst:
+                continue
+            if rule in self.suffixFirst and affected.isdisjoint(rule):
+                suffixFirst[rule] = self.suffixFirst[rule]
+            else:
+                suffixFirst[rule] = self.ruleSuffixFirst(rule)
+        self.suffixFirst = suffixFirst
+        return affected
+
+    def updateFollow(self, editedRules, firstAffected):
+        # follow меняется у нетерминалов из изменённых правил и у стоящих перед символом с новым first,
+        # а дальше — у всех нетерминалов правых частей правил затронутых нетерминалов
+        affected = set([symbol for rule in editedRules for symbol in rule if isNT(symbol)])
+        for _, rule in self.rules:
+            suffixAffected = False
+            for symbol in reversed(rule):
+                if suffixAffected and isNT(symbol):
+                    affected.add(symbol)
+                suffixAffected = suffixAffected or symbol in firstAffected
+        queue = list(affected)
+        while queue:
+            for rule in self.NT_To_Rules.get(queue.pop(), ()):
+                for symbol in rule:
+                    if isNT(symbol) and symbol not in affected:
+                        affected.add(symbol)
+                        queue.append(symbol)
+
+        for NT in affected:
+            self.followCodes[NT] = {0} if NT == self.startingNT else set([])
+        seeds = [i for i, (_, rule) in enumerate(self.rules) if not affected.isdisjoint(rule)]
+        self.runWorklist(seeds, self.updateFollowByRule, self.followDependentRules())
+        for NT in affected:
+            self.follow[NT] = self.codec.decodeSet(self.followCodes[NT])
+        return affected
+
+    def readCompiledTable(self, path='ParseTable.bin', digest=None, sourceDigest=None):
+        try:
+            table = CompiledTable(path)
+        except (OSError, ValueError):
+            return False
+        if digest is not None and table.digest != digest:
+            return False
+        if sourceDigest is not None and table.sourceDigest != sourceDigest:
+            return False
+
+        self.k = table.k
+        self.startingNT = table.startingNT
+        self.allNTs = table.symbolsOfKind(NT_KIND)
+        self.terminals = table.symbolsOfKind(TERMINAL_KIND)
+        self.parseTable = defaultdict(list, table.parseTable())
+        self.updateLookaheadTable()
+        return True
 
     def readParseTable(self):
+        # таблица с диска не привязана к загруженной грамматике
+        self.compiledGrammar = None
+        # ParseTable.bin берётся, только если он записан вместе с лежащим рядом ParseTable.txt
+        sourceDigest = None
+        if os.path.exists('ParseTable.txt'):
+            with open('ParseTable.txt', 'rb') as f:
+                sourceDigest = textDigest(f.read())
+        if os.path.exists('ParseTable.bin') and self.readCompiledTable(sourceDigest=sourceDigest):
+            return
+
         parseTable = defaultdict(set)
 
         with open('ParseTable.txt', 'r') as f:
@@ -196,6 +388,22 @@ class GeneratorPDA:
 
         for key, value in parseTable.items():
             self.parseTable[key] = list(value)
+        self.updateLookaheadTable()
+
+    def updateLookaheadTable(self):
+        # плотная таблица для разбора, правила в ней заранее развёрнуты в порядке заталкивания в стек
+        self.lookaheadTable = LookaheadTable(self.parseTable, self.k, self.terminals)
+        self.recognizer = None  # сгенерированный модуль другой таблицы больше не подходит
+
+        # длины выводов для отсечения стеков; правила, которых нет в таблице, никогда не применяются
+        rulesByNT = {NT: set([]) for NT in self.allNTs}
+        for (NT, _), rules in self.parseTable.items():
+            rulesByNT.setdefault(NT, set([])).update(map(tuple, rules))
+        self.yieldAnalysis = YieldAnalysis(rulesByNT, self.terminals)
+        # минимум и максимум не зависят от порядка символов, поэтому по развёрнутому правилу тоже
+        self.ruleLengths = {}
+        for rule, (minLen, maxLen, _, _) in self.yieldAnalysis.ruleFacts.items():
+            self.ruleLengths[rule] = self.ruleLengths[rule[::-1]] = (minLen, maxLen)
 
     # def read_term(self, symbol):
     #     self.allready_read += symbol
@@ -226,7 +434,7 @@ class GeneratorPDA:
     #     else:
     #         return False
 
-    def checkWord(self, word, tree=True):
+    def checkWord(self, word, tree=True, engine='stack', forest=False, stats=None):
         # Старый красивый код для рекурсии, удалять жалко а недетерминизм на нём реализовать
         # не придумал как, поэтому переписал всё на стек.
 
@@ -243,48 +451,190 @@ class GeneratorPDA:
         #     print('wrong pos: ' + str(self.pos) + '   len: ' + str(len(word)))
         #     return False
 
-        stacks = [([self.startingNT], 0, self.getFirstK(word))]
+        if stats is not None and (forest or engine != 'stack'):
+            # счётчики собирает только стековый разбор, другой движок молча их не заполнил бы
+            raise ValueError(f"stats are collected by engine='stack' only, not {'forest' if forest else engine!r}")
+        if forest:
+            return self.parseForest(word)
+        if stats is not None:
+            # со счётчиками всегда работает общий разбор: на нём видно ветвление по записям таблицы
+            stats.beginWord(word)
+            result = self.checkWordStacks(word, [([self.startingNT], 0)], tree, stats)
+            stats.endWord(word, result)
+            return result
+        if engine == 'gll':
+            return self.checkWordGLL(word)
+        if engine == 'compiled':
+            return self.compiledRecognizer()(word)
+        if tree:
+            return self.checkWordStacks(word, [([self.startingNT], 0)], tree)
+        return self.checkWordPredictive(word)
+
+    def compiledRecognizer(self, path='ParseTable.py'):
+        # функция recognize модуля, сгенерированного по таблице (recognizergen.py); модуль лежит рядом
+        # с ParseTable.txt и генерируется заново, только если его метка не совпадает с таблицей
+        if self.recognizer is None:
+            digest = recognizerDigest(self.k, self.startingNT, self.parseTable)
+            module = loadRecognizer(path, digest)
+            if module is None:
+                writeRecognizer(path, generateRecognizer(digest, self.lookaheadTable, self.startingNT, self.allNTs,
+                                                         self.yieldAnalysis))
+                module = loadRecognizer(path, digest)
+            self.recognizer = module.recognize
+        return self.recognizer
+
+    def checkWordGLL(self, word):
+        return self.parser().recognize(word)
+
+    def parseForest(self, word):
+        # все выводы слова одним лесом (sppf.ParseForest) или None, если слово не выводится
+        return GLLParser(self.parseTable, self.terminals, self.allNTs, self.startingNT, self.k).parse(word)
+
+    def parser(self):
+        # возобновляемый разбор: parser.feed(chunk) сколько угодно раз, затем parser.finish()
+        return GLLRecognizer(self.parseTable, self.terminals, self.allNTs, self.startingNT, self.k)
+
+    def checkWordPredictive(self, word):
+        # Детерминированный разбор одним стеком, на конфликтной записи — GLL: он разбирает и левую
+        # рекурсию через пустые выводы, на которой перебор стеков не останавливается сам
+        result = self.predictWord(word)
+        if result is None:
+            return self.checkWordGLL(word)
+        return result
+
+    def predictWord(self, word):
+        # Разбор одним стеком: пока в таблице не больше одного подходящего правила, копировать стек
+        # не нужно. True/False — ответ, None — встретилась конфликтная запись.
+        stack = [self.startingNT]
+        pos = 0
+        n = len(word)
+        allNTs = self.allNTs
+        table = self.lookaheadTable
+        terminalIds = table.terminalIds
+        encoded = table.encode(word)
+        codes, rows = encoded.codes, encoded.rows
+        minLen = self.yieldAnalysis.minLen
+        ruleLengths = self.ruleLengths
+        need = minLen[self.startingNT]  # сколько символов минимум выводит стек
+
+        while stack:
+            symbol = stack.pop()
+            terminalId = terminalIds.get(symbol)
+            if terminalId is not None:
+                if pos < n and codes[pos] == terminalId:
+                    pos += 1
+                    need -= 1
+                    continue
+                return False
+            if symbol not in allNTs:
+                # символ не из грамматики разбор пропускает (он выводит пустую строку)
+                continue
+
+            rules = table.reversedRules(symbol, rows[pos])
+            if not rules:
+                return False
+            need -= minLen[symbol]
+            free = n - pos - need
+            if len(rules) > 1:
+                rules = [rule for rule in rules if ruleLengths[rule][0] <= free]
+                if len(rules) > 1:
+                    return None
+                if not rules:
+                    return False
+            rule = rules[0]
+            if ruleLengths[rule][0] > free:
+                return False
+            stack.extend(rule)
+            need += ruleLengths[rule][0]
+
+        return pos == n
+
+    def checkWordStacks(self, word, stacks, tree=False, stats=None):
+        # Конфигурация — (стек, позиция). Слово кодируется один раз (или уже пришло закодированным
+        # из checkWordPredictive), lookahead позиции берётся готовой строкой таблицы из encoded.rows.
+        # Правило отбрасывается, если стек после раскрытия не может вывести остаток слова:
+        # остаток короче минимума или длиннее максимума длины вывода стека, в нём есть символ
+        # вне алфавита стека или, когда правило ложится на дно стека, последний символ слова не из LAST.
+        # Повторная конфигурация и стек глубже YieldAnalysis.stackBound не раскрываются, иначе перебор
+        # не останавливается на левой рекурсии через пустые выводы.
         success = False
+        table = self.lookaheadTable
+        encoded = word if isinstance(word, EncodedWord) else table.encode(word)
+        word = encoded.word
+        codes, rows = encoded.codes, encoded.rows
+        terminalIds = table.terminalIds
+        n = len(word)
+        k = self.k
+        analysis = self.yieldAnalysis
+        minLen, maxLen, alphabet = analysis.minLen, analysis.maxLen, analysis.alphabet
+        suffixMasks = analysis.suffixMasks(word)
+        lastBit = analysis.bits.get(word[-1], analysis.unknownBit) if word else 0
+        bound = analysis.stackBound(n)
+        seen = set((tuple(stack), pos) for stack, pos in stacks)
 
         while stacks:
             if tree:
-                print(stacks)
-            delete_indexes = []
+                print([(stack, pos, word[pos:pos + k]) for stack, pos in stacks])
+            if stats is not None:
+                stats.step(len(stacks))
+            delete_indexes = set([])
             for i in range(len(stacks)):
                 if not stacks[i][0]:
-                    delete_indexes.append(i)
-                    if stacks[i][1] == len(word):
+                    delete_indexes.add(i)
+                    if stacks[i][1] == n:
                         success = True
                         break
                     else:
                         continue
                 symbol = stacks[i][0].pop()
                 pos = stacks[i][1]
-                nextk = stacks[i][2]
-                if symbol in self.terminals:
-                    if pos < len(word) and word[pos] == symbol:
-                        stacks[i] = (stacks[i][0], pos + 1, self.getFirstK(word[pos + 1:]))
+                terminalId = terminalIds.get(symbol)
+                if terminalId is not None:
+                    if pos < n and codes[pos] == terminalId:
+                        stacks[i] = (stacks[i][0], pos + 1)
                     else:
-                        delete_indexes.append(i)
+                        if stats is not None:
+                            stats.mismatch(symbol, pos)
+                        delete_indexes.add(i)
                         continue
                 elif symbol in self.allNTs:
-                    rules = self.parseTable[(symbol, nextk)]
+                    # поиск без вставки: промах не добавляет в таблицу пустую запись
+                    rules = table.rules(symbol, rows[pos])
 
                     new_rules = []
-                    leni = len(stacks[i][0])
+                    rest = stacks[i][0]
+                    remaining = n - pos
+                    restMin = sum(map(minLen.__getitem__, rest))
+                    restMax = sum(map(maxLen.__getitem__, rest))
+                    missing = suffixMasks[pos] & ~reduce(or_, map(alphabet.__getitem__, rest), 0)
                     for rule in rules:
-                        if leni + len(rule) <= len(word[pos:]):
+                        ruleMin, ruleMax, ruleAlphabet, ruleLast = analysis.ruleFacts[rule]
+                        if restMin + ruleMin <= remaining <= restMax + ruleMax and not missing & ~ruleAlphabet \
+                                and (rest or not remaining or ruleLast & lastBit):
                             new_rules.append(rule)
+                    if stats is not None:
+                        nextk = word[pos:pos + k]
+                        if not rules:
+                            stats.miss(symbol, nextk)
+                        elif len(new_rules) < len(rules):
+                            stats.prune(symbol, nextk, len(rules) - len(new_rules))
+                        if new_rules:
+                            stats.expand(symbol, nextk, len(new_rules))
                     rules = new_rules
 
-                    if not rules:
-                        delete_indexes.append(i)
+                    expanded = []
+                    for rule in rules:
+                        stack = rest + list(reversed(rule))
+                        key = (tuple(stack), pos)
+                        if len(stack) <= bound and key not in seen:
+                            seen.add(key)
+                            expanded.append((stack, pos))
+                    if not expanded:
+                        delete_indexes.add(i)
                         continue
                     else:
-                        stack_i = stacks[i]
-                        stacks[i] = (stack_i[0] + list(reversed(rules[0])), pos, nextk)
-                        for rule in rules[1:]:
-                            stacks.append((stack_i[0] + list(reversed(rule)), stack_i[1], stack_i[2]))
+                        stacks[i] = expanded[0]
+                        stacks.extend(expanded[1:])
                 else:
                     print('НЕДОСТИЖИМО И СТРАННО')
                     print(stacks[i][0])
@@ -297,6 +647,47 @@ class GeneratorPDA:
 
         return success
 
+    def checkWords(self, words):
+        # Пакетная проверка. Каждое слово сначала разбирается детерминированно (predictWord), в пакет
+        # попадают только слова, встретившие конфликтную запись. Их слова одной длины (от неё зависит
+        # отсечение по длине) обходятся как бор: конфигурации на позиции pos зависят только
+        # от word[:pos + k], поэтому у слов с общим префиксом они вычисляются один раз.
+        words = list(words)
+        indexes = defaultdict(list)
+        for i, word in enumerate(words):
+            indexes[word].append(i)
+
+        results = [False] * len(words)
+        byLength = defaultdict(list)
+        for word, wordIndexes in indexes.items():
+            result = self.predictWord(word)
+            if result is None:
+                byLength[len(word)].append(word)
+            elif result:
+                for i in wordIndexes:
+                    results[i] = True
+
+        table = self.lookaheadTable
+        for n, group in byLength.items():
+            configs = ConfigStacks(self)
+            work = [(0, group, {id(configs.start): configs.start})]
+            while work:
+                pos, group, stacks = work.pop()
+                windows = defaultdict(list)
+                for word in group:
+                    windows[word[pos:pos + self.k]].append(word)
+                for nextk, subgroup in windows.items():
+                    code = table.charIds.get(nextk[0], 0) if nextk else -1
+                    accepted, shifted = configs.advance(stacks, table.rowOf(nextk), code, pos, n)
+                    if pos == n:
+                        if accepted:
+                            for word in subgroup:
+                                for i in indexes[word]:
+                                    results[i] = True
+                    elif shifted:
+                        work.append((pos + 1, subgroup, shifted))
+        return results
+
     def check_ll_k(self, startingNT=None):
         self.createParseTable(startingNT='S')
         ll_mark = True
@@ -305,35 +696,263 @@ class GeneratorPDA:
                 ll_mark = False
         return ll_mark
 
-    def get_examples(self, n=None, testing=False, allTerminals=True):
+    def findMinimalK(self, startingNT=None, maxK=10):
+        # Наименьшее k <= maxK, при котором грамматика LL(k) (None, если такого нет), и конфликтные
+        # записи (NT, lookahead) для каждого проверенного k. k растёт по одному, first/follow не строятся
+        # заново, а достраиваются от множеств для k - 1 и только для нетерминалов, оставшихся в конфликте:
+        # lookahead длины k обрезается до lookahead длины k - 1, поэтому без конфликта при k - 1 нет
+        # конфликта и при k. В конце таблица строится и записывается для найденного (или последнего) k.
+        self.readGrammar(startingNT)
+        self.k = 1
+        self.createFirst()
+        self.createFollow()
+        conflicts = {1: self.conflictingEntries()}
+        while conflicts[self.k] and self.k < maxK:
+            NTs = set([NT for NT, _ in conflicts[self.k]])
+            self.extendK(NTs)
+            conflicts[self.k] = self.conflictingEntries(NTs)
+
+        self.completeSets()
+        self.fillParseTable()
+        self.writeParseTable(grammarDigest(self.grammar_str, self.k, startingNT))
+        return (None if conflicts[self.k] else self.k), conflicts
+
+    def conflictingEntries(self, NTs=None):
+        # записи таблицы с несколькими правилами, считаются по кодам без заполнения parseTable
+        entries = defaultdict(set)
+        for NT, rule in self.rules:
+            if NTs is None or NT in NTs:
+                for x in self.codec.concat(self.suffixFirst[tuple(rule)][0], self.followCodes[NT]):
+                    entries[(NT, x)].add(tuple(rule))
+        return sorted((NT, self.codec.decode(x)) for (NT, x), rules in entries.items() if len(rules) > 1)
+
+    def extendK(self, NTs):
+        # Строки first/follow короче k — целые выводы, они верны и для k + 1 (коды префиксов от k
+        # не зависят), от них множества и достраиваются. Пересчитываются только follow нетерминалов,
+        # от которых зависит follow NTs, и first символов их правил.
+        self.k += 1
+        self.codec = KPrefixCodec(self.terminals, self.k)
+        for codeSets in (self.firstCodes, self.followCodes):
+            for NT in self.allNTs:
+                codeSets[NT] = set([x for x in codeSets[NT] if self.codec.length(x) < self.k - 1])
+
+        followNTs = self.followClosure(NTs)
+        followRules = [i for i, (NT, _) in enumerate(self.rules) if NT in followNTs]
+        firstNTs = self.firstClosure(set([symbol for i in followRules for symbol in self.rules[i][1]]))
+        firstRules = [i for i, (NT, _) in enumerate(self.rules) if NT in firstNTs]
+
+        self.runWorklist(firstRules, self.updateFirstByRule,
+                         self.restrictRules(self.firstDependentRules(), firstRules))
+        for i in followRules:
+            rule = tuple(self.rules[i][1])
+            self.suffixFirst[rule] = self.ruleSuffixFirst(rule)
+        self.runWorklist(followRules, self.updateFollowByRule,
+                         self.restrictRules(self.followDependentRules(), followRules))
+
+    def completeSets(self):
+        # после extendK часть множеств неполна; это подмножества точных, поэтому те же проходы
+        # по всем правилам, начатые с них, дают точные first и follow
+        self.runWorklist(range(len(self.rules)), self.updateFirstByRule, self.firstDependentRules())
+        self.first = self.decodeSets(self.firstCodes)
+        self.createSuffixFirst()
+        self.runWorklist(range(len(self.rules)), self.updateFollowByRule, self.followDependentRules())
+        self.follow = self.decodeSets(self.followCodes)
+
+    def firstClosure(self, symbols):
+        # нетерминалы, выводимые из symbols: от их first зависит first symbols
+        closure = set([])
+        work = [symbol for symbol in symbols if symbol in self.allNTs]
+        while work:
+            NT = work.pop()
+            if NT not in closure:
+                closure.add(NT)
+                work.extend([symbol for rule in self.NT_To_Rules[NT] for symbol in rule if symbol in self.allNTs])
+        return closure
+
+    def followClosure(self, NTs):
+        # нетерминалы, в правилах которых встречаются NTs (и так далее): от их follow зависит follow NTs
+        usedIn = defaultdict(set)
+        for NT, rule in self.rules:
+            for symbol in rule:
+                usedIn[symbol].add(NT)
+        closure = set([])
+        work = list(NTs)
+        while work:
+            NT = work.pop()
+            if NT not in closure:
+                closure.add(NT)
+                work.extend(usedIn[NT])
+        return closure
+
+    @staticmethod
+    def restrictRules(dependentRules, ruleIndexes):
+        ruleIndexes = set(ruleIndexes)
+        return defaultdict(list, {symbol: [i for i in rules if i in ruleIndexes]
+                                  for symbol, rules in dependentRules.items()})
+
+    def get_examples(self, n=None, testing=False, allTerminals=True, workers=None):
+        # грамматика, уже разобранная для таблицы, не читается повторно
         grammar = Grammar()
-        grammar.readGrammar(startingNT=self.startingNT)
+        grammar.useCompiledGrammar(self.compiledGrammar or compileGrammar(self.startingNT))
         grammar.prepareForGeneration()
-        grammar.generate(n=n, testing=testing, allTerminals=allTerminals)
-
-    def test_examples(self, tree=False):
-        with open('tests.txt', 'r') as file:
-            lines = file.readlines()
-
-        lines = [tuple(line.strip().split()) for line in lines]
-        print(lines)
+        grammar.generate(n=n, testing=testing, allTerminals=allTerminals, workers=workers)
+
+    def test_examples(self, tree=False, path='tests.txt', workers=None, chunkSize=10000, oracle=None, engine=None):
+        # Файл читается кусками по chunkSize строк, куски проверяются в пуле процессов,
+        # в работе одновременно не больше 2 * workers кусков, результаты собираются по порядку.
+        # oracle='earley' — ответ сверяется не с разметкой файла, а с распознавателем Эрли по grammar.txt.
+        # engine='compiled' — слова проверяются сгенерированным модулем ParseTable.py вместо checkWords.
+        if engine == 'compiled':
+            self.compiledRecognizer()  # модуль генерируется до запуска воркеров, они его только импортируют
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if oracle == 'earley':
+            grammar = self.compiledGrammar or compileGrammar(self.startingNT)
+            oracle = EarleyRecognizer(grammar.ntToRules(), self.startingNT)
+        start = time.perf_counter()
+        total = 0
         every_good = True
-        for word, mark in lines:
-            res = self.checkWord(word, tree)
-            if res and mark == '0':
-                print('wrong - ' + word + ' ' + mark + '    res: ' + str(self.checkWord(word)))
-                every_good = False
-            elif not res and mark == '1':
-                print('wrong - ' + word + ' ' + mark + '    res: ' + str(self.checkWord(word)))
-                every_good = False
 
+        with open(path, 'r') as file:
+            chunks = iter(lambda: list(islice(file, chunkSize)), [])
+            if tree or workers <= 1:
+                results = (self.checkTestLines(chunk, tree, oracle, engine) for chunk in chunks)
+                for count, mismatches in results:
+                    total += count
+                    every_good = self.reportMismatches(mismatches) and every_good
+            else:
+                for count, mismatches in self.checkTestChunksParallel(chunks, workers, oracle, engine):
+                    total += count
+                    every_good = self.reportMismatches(mismatches) and every_good
+
+        elapsed = time.perf_counter() - start
+        print(f'checked {total} words in {elapsed:.2f}s ({total / max(elapsed, 1e-9):.0f} words/s)')
         return every_good
 
+    def checkTestLines(self, lines, tree=False, oracle=None, engine=None):
+        tests = [line.split() for line in lines]
+        tests = [test for test in tests if test]
+        if oracle is not None:
+            tests = [(test[0], '1' if oracle.recognize(test[0]) else '0') for test in tests]
+        words = [test[0] for test in tests]
+        if tree:
+            results = [self.checkWord(word, tree) for word in words]
+        elif engine == 'compiled':
+            results = list(map(self.compiledRecognizer(), words))
+        else:
+            # слова без конфликтов checkWords разбирает детерминированно, вместе — только конфликтные
+            results = self.checkWords(words)
+        mismatches = [(word, mark, res) for (word, mark), res in zip(tests, results)
+                      if (res and mark == '0') or (not res and mark == '1')]
+        return len(tests), mismatches
+
+    def checkTestChunksParallel(self, chunks, workers, oracle=None, engine=None):
+        # воркеры читают один снимок таблицы вместо того, чтобы строить её заново
+        fd, tablePath = tempfile.mkstemp(suffix='.bin', prefix='ParseTable.')
+        os.close(fd)
+        try:
+            writeCompiledTable(tablePath, bytes(32), self.k, self.startingNT, self.allNTs, self.terminals,
+                               self.parseTable)
+            with ProcessPoolExecutor(workers, initializer=initTestWorker, initargs=(tablePath, oracle, engine)) as pool:
+                inFlight = deque()
+                for chunk in chunks:
+                    inFlight.append(pool.submit(checkTestChunk, chunk))
+                    if len(inFlight) >= 2 * workers:
+                        yield inFlight.popleft().result()
+                while inFlight:
+                    yield inFlight.popleft().result()
+        finally:
+            os.remove(tablePath)
+
+    @staticmethod
+    def reportMismatches(mismatches):
+        for word, mark, res in mismatches:
+            print('wrong - ' + word + ' ' + mark + '    res: ' + str(res))
+        return not mismatches
+
+
+class ConfigStacks:
+    # Стеки конфигураций пакетного разбора. Стек — узел списка (символ, стек под ним, сумма minLen,
+    # сумма maxLen, глубина): одинаковые хвосты общие, а суммы длин вывода всего стека хранятся в узле,
+    # поэтому раскрытие правила стоит O(длины правила), а не O(глубины стека). Узлы интернируются,
+    # так что равные стеки — один объект, и конфигурации сравниваются по id без хеширования всего стека.
+    # Пустой стек — None. Стеки глубже YieldAnalysis.stackBound отбрасываются.
+    def __init__(self, PDA):
+        self.PDA = PDA
+        self.nodes = {}
+        self.start = self.push(PDA.startingNT, None)
+
+    def push(self, symbol, below):
+        key = (symbol, id(below))
+        node = self.nodes.get(key)
+        if node is None:
+            analysis = self.PDA.yieldAnalysis
+            belowMin, belowMax, depth = below[2:] if below is not None else (0, 0, 0)
+            node = (symbol, below, belowMin + analysis.minLen[symbol], belowMax + analysis.maxLen[symbol],
+                    depth + 1)
+            self.nodes[key] = node
+        return node
+
+    def advance(self, stacks, row, code, pos, n):
+        # Раскрывает нетерминалы на вершинах стеков при строке таблицы row и возвращает
+        # (есть ли пустой стек на конце слова, стеки после чтения терминала с номером code)
+        accepted = False
+        shifted = {}
+        seen = set(stacks)
+        table = self.PDA.lookaheadTable
+        terminalIds = table.terminalIds
+        allNTs = self.PDA.allNTs
+        ruleLengths = self.PDA.ruleLengths
+        bound = self.PDA.yieldAnalysis.stackBound(n)
+        remaining = n - pos
+        work = list(stacks.values())
+        while work:
+            node = work.pop()
+            if node is None:
+                if not remaining:
+                    accepted = True
+                continue
+            symbol, below = node[0], node[1]
+            terminalId = terminalIds.get(symbol)
+            if terminalId is not None:
+                if terminalId == code:
+                    shifted[id(below)] = below
+                continue
+            if symbol in allNTs:
+                restMin, restMax = (below[2], below[3]) if below is not None else (0, 0)
+                expansions = []
+                for rule in table.reversedRules(symbol, row):
+                    ruleMin, ruleMax = ruleLengths[rule]
+                    if restMin + ruleMin <= remaining <= restMax + ruleMax:
+                        expanded = below
+                        for s in rule:
+                            expanded = self.push(s, expanded)
+                        if expanded is None or expanded[4] <= bound:
+                            expansions.append(expanded)
+            else:
+                expansions = [below]
+            for expanded in expansions:
+                if id(expanded) not in seen:
+                    seen.add(id(expanded))
+                    work.append(expanded)
+        return accepted, shifted
+
 
+workerPDA = None
+workerOracle = None
+workerEngine = None
 
 
+def initTestWorker(tablePath, oracle=None, engine=None):
+    global workerPDA, workerOracle, workerEngine
+    workerPDA = GeneratorPDA()
+    workerPDA.readCompiledTable(tablePath)
+    workerOracle = oracle
+    workerEngine = engine
 
 
+def checkTestChunk(lines):
+    return workerPDA.checkTestLines(lines, oracle=workerOracle, engine=workerEngine)
 
 
 def main():
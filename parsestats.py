@@ -0,0 +1,89 @@
+import json
+import time
+from collections import Counter
+
+
+class ParseStats:
+    # Счётчики разбора для checkWord(word, stats=ParseStats()). Методы вызываются из цикла разбора
+    # только когда stats передан, так что без него разбор ничего не платит. Для своих обработчиков
+    # достаточно унаследоваться и переопределить нужные методы.
+    def __init__(self, timeline=False):
+        self.words = 0
+        self.steps = 0
+        self.peakStacks = 0
+        # гистограмма: сколько шагов прошло с данным числом живых стеков; память не растёт с числом шагов,
+        # ряд по шагам пишется только во временную шкалу (timeline=True)
+        self.liveStacks = Counter()
+        self.expansions = Counter()
+        self.branching = Counter()
+        self.misses = Counter()
+        self.pruned = Counter()
+        self.mismatches = 0
+        self.timeline = timeline
+        self.events = []
+        self.start = time.perf_counter()
+
+    def now(self):
+        return (time.perf_counter() - self.start) * 1e6
+
+    def beginWord(self, word):
+        self.words += 1
+        if self.timeline:
+            self.events.append({'name': 'checkWord', 'ph': 'B', 'ts': self.now(), 'pid': 0, 'tid': 0,
+                                'args': {'length': len(word)}})
+
+    def endWord(self, word, result):
+        if self.timeline:
+            self.events.append({'name': 'checkWord', 'ph': 'E', 'ts': self.now(), 'pid': 0, 'tid': 0,
+                                'args': {'result': result}})
+
+    def step(self, stacks):
+        self.steps += 1
+        self.liveStacks[stacks] += 1
+        if stacks > self.peakStacks:
+            self.peakStacks = stacks
+        if self.timeline:
+            self.events.append({'name': 'live stacks', 'ph': 'C', 'ts': self.now(), 'pid': 0, 'tid': 0,
+                                'args': {'stacks': stacks}})
+
+    def expand(self, NT, nextk, rules):
+        self.expansions[NT] += 1
+        if rules > 1:
+            self.branching[(NT, nextk)] += rules - 1
+            if self.timeline:
+                self.events.append({'name': f'{NT}:{nextk}', 'ph': 'i', 's': 't', 'ts': self.now(),
+                                    'pid': 0, 'tid': 0, 'args': {'branches': rules}})
+
+    def miss(self, NT, nextk):
+        self.misses[(NT, nextk)] += 1
+
+    def prune(self, NT, nextk, rules):
+        self.pruned[(NT, nextk)] += rules
+
+    def mismatch(self, terminal, pos):
+        self.mismatches += 1
+
+    def toDict(self):
+        def entries(counter):
+            return [{'NT': NT, 'lookahead': nextk, 'count': count} for (NT, nextk), count in counter.most_common()]
+
+        return {
+            'words': self.words,
+            'steps': self.steps,
+            'peakStacks': self.peakStacks,
+            'liveStacks': {str(stacks): count for stacks, count in sorted(self.liveStacks.items())},
+            'expansions': dict(self.expansions.most_common()),
+            'branching': entries(self.branching),
+            'misses': entries(self.misses),
+            'pruned': entries(self.pruned),
+            'mismatches': self.mismatches,
+        }
+
+    def saveJSON(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.toDict(), f, indent=1, ensure_ascii=False)
+
+    def saveChromeTrace(self, path):
+        # открывается в chrome://tracing или Perfetto; нужен ParseStats(timeline=True)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
@@ -0,0 +1,228 @@
+import hashlib
+import importlib.util
+import os
+
+# Генерация отдельного модуля-распознавателя по таблице разбора. В модуле нет ссылок на код
+# проекта: символы заменены небольшими целыми (терминалы — номера символов LookaheadTable,
+# нетерминалы начинаются с NT_BASE), таблица записана литералами кортежей, а разбор — явный
+# стек, где выбор правила — обращение по индексу TABLE[строка * NT_COUNT + NT - NT_BASE].
+# Строки lookahead всех позиций находятся скользящим кодом окна из k символов.
+# Первая строка файла — метка таблицы: по ней файл берётся с диска, пока таблица не изменилась.
+
+VERSION = 2
+HEADER = '# recognizer digest: '
+
+TEMPLATE = '''\
+# Распознаватель, сгенерированный recognizergen.py по таблице разбора. Не редактировать:
+# файл перезаписывается, когда меняется таблица.
+
+K = {k}
+CHAR_IDS = {charIds!r}
+MISSING = {missing}  # номер символа не из алфавита: его нет ни в одном lookahead таблицы
+BASE = {base}
+TOP = BASE ** (K - 1)
+POWERS = tuple(BASE ** i for i in range(K + 1))
+# lookahead записан числом в системе счисления BASE, первый символ — старший разряд
+GRAM_ROWS = {gramRows!r}
+NT_BASE = {ntBase}
+NT_COUNT = {ntCount}
+START = {start}
+MIN_LEN = {minLen!r}
+MAX_LEN = {maxLen!r}
+STACK_FACTOR = {stackFactor}  # стек глубже STACK_FACTOR * (2n + 1) + 1 не нужен (YieldAnalysis.stackBound)
+# набор правил: кортеж (правило в порядке заталкивания в стек, минимум и максимум длины вывода)
+RULE_LISTS = {ruleLists!r}
+TABLE = tuple(RULE_LISTS[i] for i in {entries!r})
+
+
+def lookaheadRows(codes):
+    # строка таблицы для lookahead каждой позиции (-1 — такого lookahead в таблице нет);
+    # код окна сдвигается на символ за O(1): старший разряд отбрасывается, новый дописывается
+    n = len(codes)
+    rows = [-1] * (n + 1)
+    length = min(K, n)
+    gram = 0
+    for i in range(length):
+        gram = gram * BASE + codes[i]
+    for pos in range(n + 1):
+        rows[pos] = GRAM_ROWS.get(gram, -1)
+        if pos + K < n:
+            gram = gram % TOP * BASE + codes[pos + K]
+        elif length:
+            length -= 1
+            gram %= POWERS[length]
+    return rows
+
+
+def recognize(word):
+    # детерминированный разбор одним стеком, на конфликтной записи — поиск по всем конфигурациям
+    n = len(word)
+    codes = [CHAR_IDS.get(c, MISSING) for c in word]
+    rows = lookaheadRows(codes)
+    stack = [START]
+    pos = 0
+    need = MIN_LEN[START]
+    while stack:
+        symbol = stack.pop()
+        if symbol < NT_BASE:
+            if pos < n and codes[pos] == symbol:
+                pos += 1
+                need -= 1
+                continue
+            return False
+        row = rows[pos]
+        if row < 0:
+            return False
+        rules = TABLE[row * NT_COUNT + symbol - NT_BASE]
+        if len(rules) != 1:
+            if not rules:
+                return False
+            stack.append(symbol)
+            return search(codes, rows, tuple(stack), pos)
+        rule, ruleMin, _ = rules[0]
+        need += ruleMin - MIN_LEN[symbol]
+        if need > n - pos:
+            return False
+        stack.extend(rule)
+    return pos == n
+
+
+def search(codes, rows, stack, pos):
+    # Конфигурации на общей позиции — стеки-узлы (символ, стек под ним, сумма MIN_LEN, сумма MAX_LEN,
+    # глубина): хвосты общие, узлы интернируются, поэтому одинаковые стеки — один объект и сравниваются
+    # по id. Раскрытие отбрасывается, если длина остатка вне границ длины вывода стека или стек
+    # глубже STACK_FACTOR * (2n + 1) + 1.
+    n = len(codes)
+    bound = STACK_FACTOR * (2 * n + 1) + 1
+    nodes = {{}}
+
+    def push(symbol, below):
+        key = (symbol, id(below))
+        node = nodes.get(key)
+        if node is None:
+            belowMin, belowMax, depth = below[2:] if below is not None else (0, 0, 0)
+            node = nodes[key] = (symbol, below, belowMin + MIN_LEN[symbol], belowMax + MAX_LEN[symbol], depth + 1)
+        return node
+
+    start = None
+    for symbol in stack:
+        start = push(symbol, start)
+    configs = [start]
+    while configs:
+        remaining = n - pos
+        row = rows[pos]
+        code = codes[pos] if pos < n else -1
+        shifted = {{}}
+        seen = set(map(id, configs))
+        work = list(configs)
+        while work:
+            node = work.pop()
+            if node is None:
+                if not remaining:
+                    return True
+                continue
+            symbol, below = node[0], node[1]
+            if symbol < NT_BASE:
+                if symbol == code:
+                    shifted[id(below)] = below
+                continue
+            if row < 0:
+                continue
+            restMin, restMax = (below[2], below[3]) if below is not None else (0, 0)
+            for rule, ruleMin, ruleMax in TABLE[row * NT_COUNT + symbol - NT_BASE]:
+                if restMin + ruleMin <= remaining <= restMax + ruleMax:
+                    expanded = below
+                    for s in rule:
+                        expanded = push(s, expanded)
+                    if (expanded is None or expanded[4] <= bound) and id(expanded) not in seen:
+                        seen.add(id(expanded))
+                        work.append(expanded)
+        configs = list(shifted.values())
+        pos += 1
+    return False
+'''
+
+
+def recognizerDigest(k, startingNT, parseTable) -> str:
+    # метка по содержимому таблицы: совпадает, каким бы путём таблица ни была получена
+    entries = sorted((NT, lookahead, sorted(tuple(rule) for rule in rules))
+                     for (NT, lookahead), rules in parseTable.items() if rules)
+    digest = hashlib.sha256(repr((VERSION, k, startingNT, entries)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def generateRecognizer(digest, table, startingNT, allNTs, yieldAnalysis) -> str:
+    # table — LookaheadTable, yieldAnalysis — YieldAnalysis той же таблицы
+    NTs = sorted(set(allNTs) | set(table.ntIds) | {startingNT})
+    missing = table.width
+    ntBase = missing + 1
+    ids = dict(table.terminalIds)
+    for i, NT in enumerate(NTs):
+        ids[NT] = ntBase + i
+    symbols = [''] + table.chars + [''] + NTs
+
+    def encodeRule(rule):
+        # символы вне алфавита и не нетерминалы разбор пропускает, поэтому они не попадают в правило
+        rule = tuple(ids[symbol] for symbol in reversed(rule) if symbol in ids)
+        minLen, maxLen, _, _ = yieldAnalysis.sequenceFacts([symbols[s] for s in rule])
+        return rule, minLen, maxLen
+
+    ruleLists = tuple(tuple(encodeRule(rule) for rule in rules) for rules in table.ruleLists)
+    rowsCount = len(table.entries) // len(table.ntIds) if table.ntIds else 0
+    entries = [0] * (rowsCount * len(NTs))
+    for NT, ntId in table.ntIds.items():
+        for row in range(rowsCount):
+            entries[row * len(NTs) + ids[NT] - ntBase] = table.entries[row * len(table.ntIds) + ntId]
+
+    # коды lookahead обходом бора LookaheadTable
+    gramRows = {}
+    base = missing + 1
+    work = [(0, 0)]
+    while work:
+        node, gram = work.pop()
+        if table.rows[node] >= 0:
+            gramRows[gram] = table.rows[node]
+        for c in range(1, table.width):
+            child = table.children[node * table.width + c]
+            if child >= 0:
+                work.append((child, gram * base + c))
+
+    lengths = [(yieldAnalysis.minLen[symbol], yieldAnalysis.maxLen[symbol]) if symbol else (0, 0) for symbol in symbols]
+    return HEADER + digest + '\n' + TEMPLATE.format(
+        k=table.k,
+        charIds=table.charIds,
+        missing=missing,
+        base=base,
+        gramRows=gramRows,
+        ntBase=ntBase,
+        ntCount=len(NTs),
+        start=ids[startingNT],
+        minLen=tuple(minLen for minLen, _ in lengths),
+        maxLen=tuple(maxLen for _, maxLen in lengths),
+        stackFactor=yieldAnalysis.stackFactor,
+        ruleLists=ruleLists,
+        entries=tuple(entries),
+    )
+
+
+def writeRecognizer(path, source):
+    # запись через временный файл, чтобы параллельные процессы не импортировали недописанный модуль
+    tmpPath = f'{path}.{os.getpid()}.tmp'
+    with open(tmpPath, 'w', encoding='utf-8') as f:
+        f.write(source)
+    os.replace(tmpPath, path)
+
+
+def loadRecognizer(path, digest):
+    # модуль из path, если его метка совпадает с digest, иначе None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            header = f.readline()
+    except OSError:
+        return None
+    if header.rstrip('\n') != HEADER + digest:
+        return None
+    spec = importlib.util.spec_from_file_location('parsetable_recognizer_' + digest[:16], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,154 @@
+class ForestNode:
+    # Узел общего упакованного леса разбора (SPPF). label — нетерминал (символьный узел),
+    # терминал (лист), None (пустая строка) или позиция (rule, dot) для промежуточного узла,
+    # который хранит уже разобранное начало правила. [left, right) — покрываемый отрезок слова.
+    # Каждый вариант разбора узла — упакованный узел с ключом (rule, dot, pivot).
+    __slots__ = ('label', 'left', 'right', 'packed')
+
+    def __init__(self, label, left, right):
+        self.label = label
+        self.left = left
+        self.right = right
+        self.packed = {}
+
+    def isIntermediate(self):
+        return isinstance(self.label, tuple)
+
+    def __repr__(self):
+        return f'ForestNode({self.label!r}, {self.left}, {self.right})'
+
+
+class PackedNode:
+    __slots__ = ('rule', 'pivot', 'leftChild', 'rightChild')
+
+    def __init__(self, rule, pivot, leftChild, rightChild):
+        self.rule = rule
+        self.pivot = pivot
+        self.leftChild = leftChild
+        self.rightChild = rightChild
+
+
+class ParseForest:
+    # Все деревья разбора слова: одинаковые поддеревья хранятся один раз, поэтому размер
+    # леса полиномиален даже при экспоненциальном числе деревьев.
+    def __init__(self, root):
+        self.root = root
+
+    def nodes(self):
+        seen = {id(self.root): self.root}
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            for packed in node.packed.values():
+                for child in (packed.leftChild, packed.rightChild):
+                    if child is not None and id(child) not in seen:
+                        seen[id(child)] = child
+                        stack.append(child)
+        return list(seen.values())
+
+    def count(self):
+        # число деревьев без их построения; для циклических грамматик (A =>+ A) — float('inf')
+        counts = {}
+        onPath = set([])
+        stack = [(self.root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in counts:
+                continue
+            if not expanded:
+                if id(node) in onPath:
+                    counts[id(node)] = float('inf')
+                    continue
+                onPath.add(id(node))
+                stack.append((node, True))
+                for packed in node.packed.values():
+                    for child in (packed.leftChild, packed.rightChild):
+                        if child is not None and id(child) not in counts:
+                            if id(child) in onPath:
+                                counts[id(child)] = float('inf')
+                            else:
+                                stack.append((child, False))
+                continue
+            onPath.discard(id(node))
+            if not node.packed:
+                counts[id(node)] = 1
+                continue
+            total = 0
+            for packed in node.packed.values():
+                product = 1
+                for child in (packed.leftChild, packed.rightChild):
+                    if child is not None:
+                        product *= counts[id(child)]
+                total += product
+            counts[id(node)] = total
+        return counts[id(self.root)]
+
+    def trees(self):
+        # Ленивый перебор деревьев вида (нетерминал, [поддеревья и терминалы]) без рекурсии.
+        # Узлы обходятся слева направо по стеку pending, в узле с несколькими вариантами запоминается
+        # точка выбора, к которой возвращаемся за следующим деревом. pending и собранное начало дерева
+        # (output) — неизменяемые списки из пар (голова, хвост), поэтому точка выбора хранит их без
+        # копирования. onPath — узлы на пути от корня (защита от циклов A =>+ A), его изменения пишутся
+        # в trail и откатываются при возврате.
+        onPath = set([])
+        trail = []
+        choices = []
+        pending = (self.root, None)
+        output = None
+        while True:
+            while pending is not None:
+                item, pending = pending
+                if isinstance(item, tuple):
+                    # (узел, маркер) — все дети узла разобраны
+                    node, marker = item
+                    onPath.discard(node)
+                    trail.append((False, node))
+                    if marker is not None:
+                        children = []
+                        while output[0] is not marker:
+                            children.append(output[0])
+                            output = output[1]
+                        children.reverse()
+                        output = ((node.label, children), output[1])
+                    continue
+                node = item
+                if not node.packed:
+                    if node.label is not None:
+                        output = (node.label, output)
+                    continue
+                if node in onPath:
+                    break
+                packs = list(node.packed.values())
+                if len(packs) > 1:
+                    choices.append((node, packs, 1, pending, output, len(trail)))
+                pending, output = self.enterPacked(node, packs[0], pending, output, onPath, trail)
+            else:
+                yield output[0]
+
+            # возврат к последней точке выбора
+            if not choices:
+                return
+            node, packs, index, pending, output, trailLength = choices.pop()
+            while len(trail) > trailLength:
+                added, undone = trail.pop()
+                if added:
+                    onPath.discard(undone)
+                else:
+                    onPath.add(undone)
+            if index + 1 < len(packs):
+                choices.append((node, packs, index + 1, pending, output, trailLength))
+            pending, output = self.enterPacked(node, packs[index], pending, output, onPath, trail)
+
+    @staticmethod
+    def enterPacked(node, packed, pending, output, onPath, trail):
+        onPath.add(node)
+        trail.append((True, node))
+        # у промежуточного узла нет своего поддерева: его дети дописываются к детям родителя
+        marker = None if node.isIntermediate() else object()
+        if marker is not None:
+            output = (marker, output)
+        pending = ((node, marker), pending)
+        pending = (packed.rightChild, pending)
+        if packed.leftChild is not None:
+            pending = (packed.leftChild, pending)
+        return pending, output
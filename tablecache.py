@@ -0,0 +1,150 @@
+import hashlib
+import os
+import struct
+import sys
+from array import array
+
+from grammarir import NT_KIND, OTHER_KIND, TERMINAL_KIND
+
+# Скомпилированная таблица разбора: бинарный кеш, который читается быстрее, чем разбирается
+# ParseTable.txt, и без построения FIRST/FOLLOW. Это только кеш: каждый читатель переводит его
+# в свой словарь parseTable и заново строит LookaheadTable, общей памяти у процессов нет.
+# Числа хранятся в порядке байт машины (он входит в хеш), все секции выровнены по 4 байта.
+#
+# заголовок | symbolOffsets u32[nSymbols + 1] | kinds u8[nSymbols] | symbolBytes |
+# ruleOffsets u32[nRules + 1] | ruleSymbols u32[] | entries u32[4 * nEntries] | entryRules u32[]
+#
+# entries отсортированы по (NT, lookahead) и состоят из (NT id, lookahead id, начало, количество)
+# в массиве entryRules с номерами правил.
+# В заголовке кроме метки грамматики хранится хеш ParseTable.txt, записанного вместе с таблицей.
+
+MAGIC = b'PTBL'
+VERSION = 2
+HEADER = struct.Struct('=4sHH32s32sIIIIIII')
+
+
+def grammarDigest(grammar_str: str, k: int, startingNT=None) -> bytes:
+    digest = hashlib.sha256(grammar_str.encode('utf-8'))
+    digest.update(f'\0{k}\0{startingNT or ""}\0{sys.byteorder}\0{VERSION}'.encode('utf-8'))
+    return digest.digest()
+
+
+def textDigest(data: bytes) -> bytes:
+    # хеш ParseTable.txt, рядом с которым записана таблица: подложенный другой .txt не совпадёт
+    return hashlib.sha256(data).digest()
+
+
+def pad4(data: bytes) -> bytes:
+    return data + b'\0' * (-len(data) % 4)
+
+
+def writeCompiledTable(path, digest, k, startingNT, allNTs, terminals, parseTable, sourceDigest=bytes(32)):
+    symbols = []
+    kinds = bytearray()
+    ids = {}
+
+    def intern(symbol, kind):
+        if symbol not in ids:
+            ids[symbol] = len(symbols)
+            symbols.append(symbol)
+            kinds.append(kind)
+        return ids[symbol]
+
+    for NT in sorted(allNTs):
+        intern(NT, NT_KIND)
+    for T in sorted(terminals):
+        intern(T, TERMINAL_KIND)
+    intern(startingNT, NT_KIND)
+
+    ruleIds = {}
+    ruleOffsets = array('I', [0])
+    ruleSymbols = array('I')
+    entries = []
+    for (NT, lookahead), rules in parseTable.items():
+        if not rules:
+            continue
+        ruleList = []
+        for rule in rules:
+            rule = tuple(rule)
+            if rule not in ruleIds:
+                ruleIds[rule] = len(ruleIds)
+                ruleSymbols.extend(intern(symbol, OTHER_KIND) for symbol in rule)
+                ruleOffsets.append(len(ruleSymbols))
+            ruleList.append(ruleIds[rule])
+        entries.append((intern(NT, NT_KIND), intern(lookahead, OTHER_KIND), sorted(ruleList)))
+    entries.sort()
+
+    entryArray = array('I')
+    entryRules = array('I')
+    for NT, lookahead, ruleList in entries:
+        entryArray.extend((NT, lookahead, len(entryRules), len(ruleList)))
+        entryRules.extend(ruleList)
+
+    symbolOffsets = array('I', [0])
+    symbolBytes = bytearray()
+    for symbol in symbols:
+        symbolBytes += symbol.encode('utf-8')
+        symbolOffsets.append(len(symbolBytes))
+
+    header = HEADER.pack(MAGIC, VERSION, k, digest, sourceDigest, len(symbols), ids[startingNT], len(symbolBytes),
+                         len(ruleIds), len(ruleSymbols), len(entries), len(entryRules))
+    data = b''.join([header, symbolOffsets.tobytes(), pad4(bytes(kinds)), pad4(bytes(symbolBytes)),
+                     ruleOffsets.tobytes(), ruleSymbols.tobytes(), entryArray.tobytes(), entryRules.tobytes()])
+
+    # запись через временный файл: параллельные читатели никогда не увидят недописанную таблицу
+    tmpPath = f'{path}.{os.getpid()}.tmp'
+    with open(tmpPath, 'wb') as f:
+        f.write(data)
+    os.replace(tmpPath, path)
+
+
+class CompiledTable:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.buffer = f.read()
+        if len(self.buffer) < HEADER.size:
+            raise ValueError('compiled table is truncated')
+
+        (magic, version, self.k, self.digest, self.sourceDigest, nSymbols, startId, nSymbolBytes,
+         nRules, nRuleSymbols, nEntries, nEntryRules) = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('unknown compiled table format')
+
+        view = memoryview(self.buffer)
+        offset = HEADER.size
+
+        def take(size, fmt=None):
+            nonlocal offset
+            section = view[offset:offset + size]
+            if len(section) != size:
+                raise ValueError('compiled table is truncated')
+            offset += size + (-size % 4)
+            return section.cast(fmt) if fmt else section
+
+        self.symbolOffsets = take(4 * (nSymbols + 1), 'I')
+        self.kinds = take(nSymbols)
+        self.symbolBytes = take(nSymbolBytes)
+        self.ruleOffsets = take(4 * (nRules + 1), 'I')
+        self.ruleSymbols = take(4 * nRuleSymbols, 'I')
+        self.entries = take(16 * nEntries, 'I')
+        self.entryRules = take(4 * nEntryRules, 'I')
+
+        self.symbols = [str(self.symbolBytes[self.symbolOffsets[i]:self.symbolOffsets[i + 1]], 'utf-8')
+                        for i in range(nSymbols)]
+        self.startingNT = self.symbols[startId]
+
+    def symbolsOfKind(self, kind) -> set:
+        return set(symbol for symbol, symbolKind in zip(self.symbols, self.kinds) if symbolKind == kind)
+
+    def rule(self, i) -> tuple:
+        return tuple(self.symbols[s] for s in self.ruleSymbols[self.ruleOffsets[i]:self.ruleOffsets[i + 1]])
+
+    def parseTable(self) -> dict:
+        rules = [self.rule(i) for i in range(len(self.ruleOffsets) - 1)]
+        table = {}
+        entries = self.entries
+        for e in range(0, len(entries), 4):
+            start = entries[e + 2]
+            table[(self.symbols[entries[e]], self.symbols[entries[e + 1]])] = \
+                [rules[r] for r in self.entryRules[start:start + entries[e + 3]]]
+        return table
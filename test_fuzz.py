@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+
+from fuzz import Grammar
+from grammarir import CompiledGrammar
+
+
+class EmptyLanguageTest(unittest.TestCase):
+    # у S нет конечных выводов: HNFTransform удаляет все правила вместе со стартовым нетерминалом
+    def setUp(self):
+        self.grammar = Grammar()
+        self.grammar.useCompiledGrammar(CompiledGrammar.fromText('S -> aS | SB\nB -> b', 'S'))
+        self.grammar.prepareForGeneration()
+
+    def test_start_removed(self):
+        self.assertNotIn('S', self.grammar.allNTs)
+
+    def test_no_derivations(self):
+        self.assertEqual(self.grammar.countDerivations(3), 0)
+        self.assertIsNone(self.grammar.sampleWord(3))
+
+    def test_generate_balanced(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                self.assertIsNone(self.grammar.generateBalanced(10, 3))
+                self.assertFalse(os.path.exists('tests.txt'))
+            finally:
+                os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+from main import GeneratorPDA
+from parsestats import ParseStats
+
+
+class GrammarTestCase(unittest.TestCase):
+    # таблицы и grammar.txt читаются и пишутся в текущем каталоге, поэтому каждый тест — во временном
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.TemporaryDirectory()
+        os.chdir(self.dir.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.dir.cleanup()
+
+    def makePDA(self, grammar, k=1):
+        with open('grammar.txt', 'w') as f:
+            f.write(grammar)
+        PDA = GeneratorPDA(k)
+        PDA.createParseTable(startingNT='S', useCache=False)
+        return PDA
+
+
+class NullableLeftRecursionTest(GrammarTestCase):
+    # левая рекурсия через пустые выводы: стек растёт, не читая вход
+    words = ['', 'a', 'ab', 'abb', 'ba', 'b', 'aab']
+
+    def checkEngines(self, PDA):
+        expected = [PDA.checkWord(word, engine='gll') for word in self.words]
+        recognizer = PDA.compiledRecognizer()
+        self.assertEqual([PDA.checkWord(word, tree=False) for word in self.words], expected)
+        self.assertEqual([PDA.checkWord(word, tree=False, stats=ParseStats()) for word in self.words], expected)
+        self.assertEqual(PDA.checkWords(self.words), expected)
+        self.assertEqual([recognizer(word) for word in self.words], expected)
+        return expected
+
+    def test_left_recursion_with_empty_rule(self):
+        PDA = self.makePDA('S -> SB | a\nB -> b | ')
+        self.assertEqual(self.checkEngines(PDA), [False, True, True, True, False, False, False])
+
+    def test_nullable_cycle(self):
+        PDA = self.makePDA('S -> BA | \nA -> | aA | a\nB -> b | AS | AaB', k=2)
+        self.checkEngines(PDA)
+
+
+class BatchEditsTest(GrammarTestCase):
+    grammar = 'S -> AB | aC\nA -> aA | e\nB -> bB | ab\nC -> cd | f'
+
+    def edit(self, PDA):
+        PDA.addRule('C', 'cCd')
+        PDA.removeRule('A', 'e')
+        PDA.replaceRules('B', ['b', 'aBb'])
+
+    def test_batch_matches_single_edits(self):
+        PDA = self.makePDA(self.grammar, k=2)
+        self.edit(PDA)
+        with open('ParseTable.txt') as f:
+            expected = f.read()
+        words = ['aab', 'aaabb', 'acd', 'accdd', 'af', 'ae', 'aeb']
+        answers = [PDA.checkWord(word, tree=False) for word in words]
+
+        PDA = self.makePDA(self.grammar, k=2)
+        writes = []
+        writeParseTable = PDA.writeParseTable
+        PDA.writeParseTable = lambda digest: writes.append(writeParseTable(digest))
+        with PDA.batchEdits():
+            self.edit(PDA)
+            self.assertEqual(writes, [])
+        self.assertEqual(len(writes), 1)
+        with open('ParseTable.txt') as f:
+            self.assertEqual(f.read(), expected)
+        self.assertEqual([PDA.checkWord(word, tree=False) for word in words], answers)
+
+
+class CheckWordStatsTest(GrammarTestCase):
+    def test_stats_with_other_engine(self):
+        PDA = self.makePDA('S -> aSb | ')
+        stats = ParseStats()
+        self.assertTrue(PDA.checkWord('aabb', tree=False, stats=stats))
+        for options in ({'engine': 'gll'}, {'engine': 'compiled'}, {'forest': True}):
+            with self.assertRaises(ValueError):
+                PDA.checkWord('aabb', tree=False, stats=stats, **options)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+from collections import defaultdict, deque
+
+UNBOUNDED = 1 << 60  # «бесконечная» длина: целое, чтобы суммы можно было вычитать обратно
+
+
+class YieldAnalysis:
+    # Факты о словах, выводимых из символов: минимальная и максимальная длина (UNBOUNDED, если
+    # длина не ограничена), алфавит и LAST — символы, которыми может заканчиваться непустой вывод.
+    # Множества символов — битовые маски по номерам терминалов, символ не из алфавита получает
+    # бит, которого нет ни в одной маске. Нетерминал без конечных выводов получает minLen == UNBOUNDED.
+    # Неизвестные символы правил (их разбор пропускает) выводят пустую строку.
+    def __init__(self, rulesByNT, terminals):
+        self.rulesByNT = {NT: [tuple(rule) for rule in rules] for NT, rules in rulesByNT.items()}
+        width = max((len(rule) for rules in self.rulesByNT.values() for rule in rules), default=1)
+        self.stackFactor = (max(width, 1) - 1) * len(self.rulesByNT)
+        self.bits = {T: 1 << i for i, T in enumerate(sorted(terminals))}
+        self.unknownBit = 1 << len(self.bits)
+
+        self.minLen = defaultdict(int)
+        self.maxLen = defaultdict(int)
+        self.alphabet = defaultdict(int)
+        self.last = defaultdict(int)
+        for T, bit in self.bits.items():
+            self.minLen[T] = self.maxLen[T] = 1
+            self.alphabet[T] = self.last[T] = bit
+
+        self.findMinLen()
+        self.findMaxLen()
+        self.findAlphabetAndLast()
+        self.ruleFacts = {}
+        for rules in self.rulesByNT.values():
+            for rule in rules:
+                self.ruleFacts[rule] = self.sequenceFacts(rule)
+
+    def usableRules(self, NT):
+        # правила, все символы которых выводят хоть одно слово
+        return [rule for rule in self.rulesByNT[NT] if all(self.minLen[s] < UNBOUNDED for s in rule)]
+
+    def findMinLen(self):
+        # минимум по правилам суммы минимумов, пересчитываются только правила с уменьшившимся символом
+        dependent = defaultdict(list)
+        for NT, rules in self.rulesByNT.items():
+            self.minLen[NT] = UNBOUNDED
+            for rule in rules:
+                for symbol in set(rule):
+                    dependent[symbol].append((NT, rule))
+        queue = deque((NT, rule) for NT, rules in self.rulesByNT.items() for rule in rules)
+        while queue:
+            NT, rule = queue.popleft()
+            length = min(sum(self.minLen[s] for s in rule), UNBOUNDED)
+            if length < self.minLen[NT]:
+                self.minLen[NT] = length
+                queue.extend(dependent[NT])
+
+    def findMaxLen(self):
+        # Кан по графу зависимостей между нетерминалами: нетерминалы, оставшиеся на циклах
+        # или зависящие от них, считаются неограниченными (для отсечения это безопасная оценка)
+        usable = {NT: self.usableRules(NT) for NT in self.rulesByNT}
+        waitingFor = {}
+        parents = defaultdict(list)
+        queue = deque()
+        for NT, rules in usable.items():
+            children = set([s for rule in rules for s in rule if s in usable])
+            waitingFor[NT] = len(children)
+            for child in children:
+                parents[child].append(NT)
+            if not children:
+                queue.append(NT)
+        while queue:
+            NT = queue.popleft()
+            self.maxLen[NT] = max([min(sum(self.maxLen[s] for s in rule), UNBOUNDED) for rule in usable[NT]],
+                                  default=0)
+            for parent in parents[NT]:
+                waitingFor[parent] -= 1
+                if waitingFor[parent] == 0:
+                    queue.append(parent)
+        for NT, count in waitingFor.items():
+            if count:
+                self.maxLen[NT] = UNBOUNDED
+
+    def findAlphabetAndLast(self):
+        # обе маски только растут, поэтому достаточно передавать изменения родителям
+        alphabetParents = defaultdict(set)
+        lastParents = defaultdict(set)
+        for NT in self.rulesByNT:
+            for rule in self.usableRules(NT):
+                for symbol in rule:
+                    alphabetParents[symbol].add(NT)
+                for symbol in reversed(rule):
+                    lastParents[symbol].add(NT)
+                    if self.minLen[symbol]:
+                        break
+        for masks, parents in ((self.alphabet, alphabetParents), (self.last, lastParents)):
+            queue = deque(self.bits)
+            while queue:
+                symbol = queue.popleft()
+                for parent in parents[symbol]:
+                    if masks[symbol] & ~masks[parent]:
+                        masks[parent] |= masks[symbol]
+                        queue.append(parent)
+
+    def stackBound(self, n):
+        # Глубина стека, которой хватает для разбора слова длины n. В кратчайшем дереве вывода на пути
+        # от корня нет двух узлов с одним нетерминалом и одним отрезком слова (верхний можно заменить
+        # нижним), вложенных отрезков не больше 2n + 1, а каждый узел пути оставляет в стеке на единицу
+        # меньше символов, чем в самом длинном правиле. Глубже растут только стеки левой рекурсии
+        # через пустые выводы.
+        return self.stackFactor * (2 * n + 1) + 1
+
+    def sequenceFacts(self, symbols):
+        # (min, max, алфавит, LAST) для цепочки символов
+        minSum = min(sum(self.minLen[s] for s in symbols), UNBOUNDED)
+        maxSum = min(sum(self.maxLen[s] for s in symbols), UNBOUNDED)
+        alphabet = 0
+        for s in symbols:
+            alphabet |= self.alphabet[s]
+        last = 0
+        for s in reversed(symbols):
+            last |= self.last[s]
+            if self.minLen[s]:
+                break
+        return minSum, maxSum, alphabet, last
+
+    def suffixMasks(self, word):
+        # suffixMasks[pos] — маска символов word[pos:]
+        masks = [0] * (len(word) + 1)
+        bits = self.bits
+        for pos in range(len(word) - 1, -1, -1):
+            masks[pos] = masks[pos + 1] | bits.get(word[pos], self.unknownBit)
+        return masks